@@ -0,0 +1,182 @@
+"""
+Synthetic XA exports for benchmarking
+
+Writes a week of daily exports ('Monday Sched Conform WK23.csv' ... 'Saturday Sched Conform WK23.csv') with
+the same 18 columns as the real export, so they go through df_cleaning like the real ones: dates in both
+m/d/yy and m/d/yyyy, numbers with comma thousands separators, facilities outside schedule conformance,
+MO operations that progress, complete (and stay in the export with an actual completion date) or are
+added during the week.
+
+    python benchmarks/generate_exports.py OUTPUT_FOLDER --rows 100000 --facilities 60 --departments 12
+
+Without --facilities/--departments the facilities and departments of schedule_conformance are used.
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))     #repository folder, for schedule_conformance
+
+from schedule_conformance.departments import facility_departments as repo_facility_departments
+from schedule_conformance.weeks import weekdays
+
+
+export_columns = ["Facility", "Department", "Order", "Item", "Item Description", "OP Seq", "Start Date", "Actual Start Date",
+                  "Complete Date", "Actual Completion Date", "Due date", "MOP  QTY Remaining", "OP Status",
+                  "MO Qty Remaining", "Mach Hrs Remaining", "Labor Hrs Remaining", "Hours Remaining", "Last Activity Date"]
+
+
+def synthetic_departments(facilities = None, departments = None):
+    """
+    Facility to department map of the synthetic exports
+
+    Parameters
+    ----------
+    facilities, departments : int
+        number of schedule conformance facilities and departments, None uses the map in schedule_conformance.
+
+    Returns
+    -------
+    mapping : dictionary
+        facility as the key and its department as the value.
+    """
+    if facilities is None and departments is None:
+        return dict(repo_facility_departments)
+    facilities = facilities or len(repo_facility_departments)
+    departments = min(departments or 5, facilities)
+    return {f"MACH{number+1}": f"Dept{number % departments + 1}" for number in range(facilities)}
+
+
+def format_dates(days, rng, missing = None):
+    """
+    Format day numbers (numpy datetime64[D]) as m/d/yyyy or m/d/yy text, picked at random for every value
+    """
+    stamps = pd.DatetimeIndex(days)
+    short_year = rng.random(len(days)) < 0.5
+    year = np.where(short_year, (stamps.year % 100).astype(str).str.zfill(2), stamps.year.astype(str))
+    text = pd.Series(stamps.month.astype(str) + "/" + stamps.day.astype(str) + "/" + year)
+    if missing is not None:
+        text[missing] = None
+    return text
+
+
+def format_numbers(values, decimals):
+    """
+    Format numbers as text, with comma thousands separators for values of 1000 or more
+    """
+    values = np.round(values, decimals)
+    text = pd.Series(values).astype(str).str.replace(r"\.0$", "", regex = True)
+    large = np.abs(values) >= 1000
+    text[large] = pd.Series(values[large]).map(lambda value: f"{value:,.{decimals}f}").to_numpy()
+    if decimals: 
+        text[large] = text[large].str.rstrip("0").str.rstrip(".")
+    return text
+
+
+def generate_week(output_dir, rows, week = 23, year = 2025, mapping = None, other_share = 0.3, seed = 0):
+    """
+    Write a week of synthetic daily exports
+
+    Parameters
+    ----------
+    output_dir : string
+        folder to write the six CSV files to.
+    rows : int
+        number of MO operations in each export (monday's export has exactly this many).
+    week, year : int
+        ISO week of the exports, used for the file names and the dates.
+    mapping : dictionary
+        facility to department map of schedule conformance facilities, see synthetic_departments.
+    other_share : float
+        share of operations in facilities outside schedule conformance.
+    seed : int
+        random seed, the same arguments always write the same files.
+
+    Returns
+    -------
+    paths : list
+        paths of the written exports, monday to saturday.
+    """
+    rng = np.random.default_rng(seed)
+    mapping = synthetic_departments() if mapping is None else mapping
+    monday = np.datetime64(date.fromisocalendar(year, week, 1), "D")
+    #operations added later in the week are appended, each day's export has rows // 20 more than the day before
+    total = rows + rows // 20 * 5
+    first_day = np.concatenate([np.zeros(rows, dtype = int), np.repeat(np.arange(1, 6), rows // 20)])
+
+    facilities = np.array(list(mapping))
+    other = rng.random(total) < other_share
+    facility = np.where(other, "OTHER" + pd.Series(rng.integers(1, 150, total)).astype(str).to_numpy(),
+                        facilities[rng.integers(0, len(facilities), total)])
+    department = pd.Series(facility).map(mapping).fillna("DeptX").to_numpy()
+    order_number = np.arange(total) // 3                          #about three operations per MO
+    order = "M" + pd.Series(order_number).astype(str).str.zfill(7)
+    op_seq = (np.arange(total) % 3 + 1) * 10
+    item = "ITEM" + pd.Series(order_number // 2).astype(str)
+    description = "OPER" + pd.Series(np.arange(total)).astype(str).str.zfill(7)
+
+    sch_comp = monday + rng.integers(-3, 15, total).astype("timedelta64[D]")
+    sch_start = sch_comp - rng.integers(0, 4, total).astype("timedelta64[D]")
+    due = sch_comp + rng.integers(0, 6, total).astype("timedelta64[D]")
+    act_start = sch_start - rng.integers(0, 10, total).astype("timedelta64[D]")
+    started = rng.random(total) < 0.3
+    qty = rng.integers(1, 5000, total).astype(float)
+    mo_qty = qty + rng.integers(0, 500, total)
+    mach_hrs = np.round(rng.gamma(0.6, 40, total), 2)
+    labor_hrs = np.round(mach_hrs * rng.uniform(0.8, 1.5, total), 2)
+    hours = np.round(labor_hrs + rng.uniform(0, 30, total), 2)
+    completed_on = rng.choice(7, total, p = [0.12, 0.12, 0.12, 0.12, 0.12, 0.1, 0.3])   #weekday number, 6 is not this week
+    completed_on = np.maximum(completed_on, first_day)
+    last_activity = monday - rng.integers(1, 30, total).astype("timedelta64[D]")
+
+    static = pd.DataFrame({"Facility": facility, "Department": department, "Order": order, "Item": item,
+                           "Item Description": description, "OP Seq": op_seq,
+                           "Start Date": format_dates(sch_start, rng),
+                           "Actual Start Date": format_dates(act_start, rng, ~started),
+                           "Complete Date": format_dates(sch_comp, rng), "Due date": format_dates(due, rng)})
+    os.makedirs(output_dir, exist_ok = True)
+    paths = []
+    for day in range(6):
+        present = first_day <= day
+        done = completed_on < day                                 #completed on an earlier day, still in the export
+        progress = np.clip(day / (completed_on + 1), 0, 1)        #share of the operation done by this export
+        remaining = np.where(done, 0, 1 - progress * rng.uniform(0.5, 1, total))
+        active = (progress > 0) & ~done
+        activity = np.where(active, monday + np.maximum(day - 1, 0), np.where(done, monday + completed_on, last_activity))
+        status = np.where(done, "40-Operation Complete", np.where(active | started, "30-Activity reported", "10-No Activity reported"))
+        df = static.assign(**{"Actual Completion Date": format_dates(monday + completed_on, rng, ~done),
+                              "MOP  QTY Remaining": format_numbers(np.ceil(qty * remaining), 0),
+                              "OP Status": status,
+                              "MO Qty Remaining": format_numbers(np.ceil(mo_qty * remaining), 0),
+                              "Mach Hrs Remaining": format_numbers(mach_hrs * remaining, 2),
+                              "Labor Hrs Remaining": format_numbers(labor_hrs * remaining, 2),
+                              "Hours Remaining": format_numbers(hours * remaining, 2),
+                              "Last Activity Date": format_dates(activity.astype("datetime64[D]"), rng, ~(active | done | started))})
+        path = os.path.join(output_dir, f"{weekdays[day]} Sched Conform WK{week}.csv")
+        df.loc[present, export_columns].to_csv(path, index = False, encoding = "utf-8-sig")   #XA exports start with a BOM
+        paths.append(path)
+    return paths
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Write a week of synthetic XA exports")
+    parser.add_argument("output_dir")
+    parser.add_argument("--rows", type = int, default = 10000, help = "MO operations in each export")
+    parser.add_argument("--facilities", type = int, help = "schedule conformance facilities, default the real ones")
+    parser.add_argument("--departments", type = int, help = "departments, default the real ones")
+    parser.add_argument("--week", type = int, default = 23)
+    parser.add_argument("--year", type = int, default = 2025)
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args(argv)
+    mapping = synthetic_departments(args.facilities, args.departments)
+    for path in generate_week(args.output_dir, args.rows, args.week, args.year, mapping, seed = args.seed):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
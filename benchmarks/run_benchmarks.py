@@ -0,0 +1,228 @@
+"""
+Benchmarks of each stage of the schedule conformance calculations on synthetic exports
+
+For every size, a week of exports is generated (see generate_exports.py) and each stage is timed with its
+peak memory (memory allocated by Python and numpy, traced with tracemalloc):
+
+    ingest          reading the six CSVs with the declared schema
+    clean           df_cleaning of each export
+    day dictionaries    create_by_day_dictionaries, from the cleaned exports
+    update_status   adding each day to the scheduled timeline and status
+    not scheduled   setup_not_sched_statuses
+    progress        run_status_calcs
+    forecast        forecast_week from wednesday (5000 trials, drawing from monday's and tuesday's burn rates)
+    excel           write_reports, every workbook of a saturday run
+    plot            the status charts, the summary and one per department
+
+Results are saved as JSON in benchmarks/results, and compared with an earlier result file with --compare
+to catch regressions between versions:
+
+    python benchmarks/run_benchmarks.py --rows 10000 100000 1000000
+    python benchmarks/run_benchmarks.py --rows 10000 100000 --compare benchmarks/results/<earlier run>.json
+
+Tracing memory slows some stages down, use --no-memory for timings only. --low-memory runs the stages in low
+memory mode (see settings.low_memory) to compare its memory with the default.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(benchmarks_dir))             #repository folder, for schedule_conformance
+
+from generate_exports import generate_week, synthetic_departments
+from schedule_conformance import settings
+from schedule_conformance.departments import configure_departments
+from schedule_conformance.forecast import forecast_week
+from schedule_conformance.ingest import df_cleaning, read_dtypes
+from schedule_conformance.reports import draw_plot, write_reports
+from schedule_conformance.status import (create_by_day_dictionaries, run_status_calcs, setup_not_sched_statuses,
+                                         update_status)
+from schedule_conformance.weeks import beginning_end_of_week, weekdays
+
+try:
+    import resource
+except ImportError:                                             #not available on Windows
+    resource = None
+
+
+def measure(results, stage, trace_memory, function, *args, requires = ()):
+    """
+    Run one stage, store its time (seconds) and peak traced memory (MB) in results, and return its result
+
+    A stage that fails stores its error and returns None. A stage is skipped (and returns None) if any of
+    requires, the results of earlier stages it uses, is None because that stage failed or was skipped.
+    """
+    if any(value is None for value in requires):
+        results[stage] = {"skipped": "an earlier stage it needs failed"}
+        return None
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        value = function(*args)
+    except Exception as error:                                  #a failing stage doesn't stop the others
+        results[stage] = {"error": repr(error)}
+        return None
+    finally:
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+    results[stage] = {"seconds": round(seconds, 4), "peak_mb": None if peak is None else round(peak / 2**20, 2)}
+    return value
+
+
+def benchmark_week(export_dir, week = 23, year = 2025, trace_memory = True):
+    """
+    Time each stage of a saturday run on a week of exports
+
+    Returns
+    -------
+    stages : dictionary
+        stage name as the key, dictionary with seconds and peak_mb (or the error, or why it was skipped) as the value.
+    """
+    stages = {}
+    weekday_number = 5
+    beginning_of_week, end_of_week = beginning_end_of_week(week, year)
+    today = beginning_of_week + pd.Timedelta(days = weekday_number+2)
+    paths = [os.path.join(export_dir, f"{weekdays[day]} Sched Conform WK{week}.csv") for day in range(weekday_number+1)]
+
+    def ingest():
+        dtypes = read_dtypes()
+        return [pd.read_csv(path, usecols = list(dtypes), dtype = dtypes, thousands = ",") for path in paths]
+    raw = measure(stages, "ingest", trace_memory, ingest)
+    cleaned = measure(stages, "clean", trace_memory, lambda: [df_cleaning(df) for df in raw], requires = [raw])
+    exports = None if cleaned is None else dict(zip(weekdays, cleaned))
+    del raw
+
+    LRP_by_day, not_sched_by_day = measure(stages, "day dictionaries", trace_memory, lambda: create_by_day_dictionaries(
+        weekday_number, week, beginning_of_week, end_of_week, today, export_dir, exports = exports),
+        requires = [exports]) or (None, None)
+
+    def statuses():
+        timeline, status = None, {}
+        for day in weekdays[:weekday_number+1]:
+            timeline = update_status(day, LRP_by_day, timeline, status)
+        return timeline, status
+    timeline, status = measure(stages, "update_status", trace_memory, statuses, requires = [LRP_by_day]) or (None, None)
+    not_scheduled_dict = measure(stages, "not scheduled", trace_memory, setup_not_sched_statuses, not_sched_by_day,
+                                 requires = [not_sched_by_day])
+    measure(stages, "progress", trace_memory, run_status_calcs, status, requires = [status])
+    measure(stages, "forecast", trace_memory, forecast_week, timeline, 2, None, 5000, requires = [timeline])
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        working_dir = os.getcwd()
+        os.chdir(output_dir)                                    #reports are written to the working folder
+        try:
+            measure(stages, "excel", trace_memory, lambda: write_reports(week, weekday_number, timeline, status,
+                    not_scheduled_dict, year = year), requires = [timeline, status, not_scheduled_dict])
+            measure(stages, "plot", trace_memory, draw_plot, status, weekday_number, week, requires = [status])
+        finally:
+            os.chdir(working_dir)
+    return stages
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd = benchmarks_dir, capture_output = True,
+                              text = True, check = True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, earlier, threshold):
+    """
+    Print the change in time of each stage against an earlier result file
+
+    Returns
+    -------
+    regressions : list
+        (rows, stage, ratio) of each stage that is slower than threshold times the earlier time.
+    """
+    earlier_runs = {run["rows"]: run["stages"] for run in earlier["runs"]}
+    for setting in ["facilities", "departments", "memory traced", "low memory"]:
+        if results[setting] != earlier.get(setting):
+            print(f"warning: {setting} differs from the earlier run ({earlier.get(setting)} then, {results[setting]} now)")
+    regressions = []
+    for run in results["runs"]:
+        if run["rows"] not in earlier_runs:
+            continue
+        print(f"\n{run['rows']} rows, compared with {earlier.get('commit') or earlier['timestamp']}")
+        for stage, result in run["stages"].items():
+            before = earlier_runs[run["rows"]].get(stage, {})
+            if "seconds" not in result or not before.get("seconds"):
+                continue
+            ratio = result["seconds"] / before["seconds"]
+            flag = "  REGRESSION" if ratio > threshold else ""
+            print(f"  {stage:<18}{before['seconds']:>10.3f}s {result['seconds']:>10.3f}s {ratio:>7.2f}x{flag}")
+            if ratio > threshold:
+                regressions.append((run["rows"], stage, ratio))
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = "Time each stage of the calculations on synthetic exports")
+    parser.add_argument("--rows", type = int, nargs = "+", default = [10000, 100000], help = "MO operations per export, one run per size")
+    parser.add_argument("--facilities", type = int, help = "schedule conformance facilities, default the real ones")
+    parser.add_argument("--departments", type = int, help = "departments, default the real ones")
+    parser.add_argument("--no-memory", action = "store_true", help = "don't trace memory (faster, timings only)")
+    parser.add_argument("--low-memory", action = "store_true", help = "run the stages in low memory mode")
+    parser.add_argument("--output", help = "result file, default benchmarks/results/<date time>.json")
+    parser.add_argument("--compare", help = "earlier result file to compare the timings with")
+    parser.add_argument("--threshold", type = float, default = 1.25, help = "slowdown reported as a regression")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args(argv)
+
+    mapping = synthetic_departments(args.facilities, args.departments)
+    configure_departments(mapping)
+    settings.configure(cache_dir = None, low_memory = args.low_memory)     #every stage starts from the CSVs
+    results = {"timestamp": datetime.now().isoformat(timespec = "seconds"), "commit": git_commit(),
+               "python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+               "platform": platform.platform(), "facilities": len(mapping), "departments": len(set(mapping.values())),
+               "memory traced": not args.no_memory, "low memory": args.low_memory, "runs": []}
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as export_dir:
+            generate_week(export_dir, rows, mapping = mapping, seed = args.seed)
+            stages = benchmark_week(export_dir, trace_memory = not args.no_memory)
+        results["runs"].append({"rows": rows, "stages": stages})
+        print(f"{rows} rows")
+        for stage, result in stages.items():
+            if "error" in result:
+                print(f"  {stage:<18}failed - {result['error']}")
+            elif "skipped" in result:
+                print(f"  {stage:<18}skipped - {result['skipped']}")
+            else:
+                memory = "" if result["peak_mb"] is None else f"{result['peak_mb']:>10.1f} MB"
+                print(f"  {stage:<18}{result['seconds']:>10.3f}s{memory}")
+    if resource is not None:
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        results["max_rss_mb"] = round(max_rss / (2**20 if sys.platform == "darwin" else 2**10), 1)   #bytes on macOS, KB on Linux
+
+    output = args.output or os.path.join(benchmarks_dir, "results", datetime.now().strftime("%Y-%m-%d %H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok = True)
+    with open(output, "w") as file:
+        json.dump(results, file, indent = 2)
+    print(f"\nsaved {output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,26 @@
+"""
+Schedule conformance calculations from the daily XA exports
+
+The calculations can be used without the Excel and plotting stack, e.g. 
+
+    from schedule_conformance import compute_status
+    status = compute_status(week = 23, weekday = "Friday")
+
+openpyxl is only imported by schedule_conformance.reports and matplotlib by schedule_conformance.plots, 
+when a workbook or plot is written. Run python -m schedule_conformance --help for the command line.
+"""
+
+from . import settings
+from . import metrics
+from .settings import configure
+from .departments import configure_departments, dept_facilities, facility_departments, sch_conf_facilities, split_by_dept
+from .weeks import beginning_end_of_week, current_week, export_path, weekday_name_to_num, weekdays
+from .ingest import df_cleaning, load_clean_export, parse_date, read_export
+from .snapshots import add_snapshot, diff_exports, diff_snapshots
+from .status import (calc_progress, compute_status, compute_week, create_by_day_dictionaries, scheduled_mos_on, 
+                     setup_not_sched_statuses, update_status)
+from .forecast import forecast_week
+from .backfill import backfill
+from .watch import watch
+from .intraday import compute_intraday
+from .reasons import ingest_reasons, load_reasons, reason_pareto
@@ -0,0 +1,181 @@
+"""
+Backfill
+
+Rebuilds the status history of past weeks from a folder of their exports. Week boundaries come from the week 
+number and the year given or the year of the dates in the week's monday export (not today's date, see export_year), 
+and each week is calculated in its own process, so a year of weeks takes about as long as one week per core. The status tables of all weeks are written to one 
+dataset with Year, Week and Dept columns, and each facility's daily burn rates to settings.burn_rates_path 
+(the history the end of week forecast draws from, see forecast). Re-running a week replaces its rows.
+
+"""
+
+import os
+import re
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+
+import pandas as pd
+
+from . import settings
+from .forecast import burn_rates
+from .ingest import load_clean_export
+from .status import compute_week
+from .weeks import beginning_end_of_week, export_path, weekdays
+
+
+burn_rate_columns = ["Year", "Week", "Facility", "Weekday", "Start hours", "Hours burned", "Burn rate"]
+export_pattern = re.compile(r"^(" + "|".join(weekdays) + r") Sched Conform Wk(\d+)\.csv$", re.IGNORECASE)
+
+
+def find_weeks(export_dir): 
+    """
+    Find the exports of every week in a folder and its subfolders
+
+    Returns
+    -------
+    weeks : dictionary
+        (folder, week) as the key and a dictionary of weekday name: path of the export as the value.
+    """
+    weeks = {}
+    for folder, subfolders, files in os.walk(export_dir): 
+        for file in files: 
+            match = export_pattern.match(file)
+            if match: 
+                day = match.group(1).capitalize()
+                weeks.setdefault((folder, int(match.group(2))), {})[day] = os.path.join(folder, file)
+    return weeks
+
+
+def dates_year(dates, week): 
+    """
+    Most common ISO year of the dates that fall in ISO week number week, None if none do
+    """
+    iso = dates.dropna().dt.isocalendar()
+    years = iso.loc[iso["week"] == week, "year"]
+    return int(years.mode().iloc[0]) if len(years) else None
+
+
+def export_year(path, week): 
+    """
+    ISO year of a week from its monday export, the year of the export's dates that fall in the week
+
+    The scheduled completion dates decide (monday's list is the operations due that week), the last activity 
+    dates are a check. If they disagree, or no date falls in the week and the file's modified date is used 
+    instead, a warning says so (pass the year to be sure).
+    """
+    df = load_clean_export(path)
+    scheduled, activity = dates_year(df["Sch comp"], week), dates_year(df["Last activity"], week)
+    if scheduled is not None and activity is not None and scheduled != activity: 
+        warnings.warn(f"week {week}: scheduled completion dates of {path} are in {scheduled} and last activity "
+                      f"dates in {activity}, using {scheduled}")
+    year = scheduled if scheduled is not None else activity
+    if year is None: 
+        year = date.fromtimestamp(os.path.getmtime(path)).isocalendar()[0]
+        warnings.warn(f"week {week}: no dates of {path} fall in the week, using the year it was saved ({year})")
+    return year
+
+
+def backfill_week(folder, week, year, weekday_number, options = None): 
+    """
+    Calculate one past week's status and burn rates, as rows of the history datasets (run in a worker process)
+
+    year None finds the week's year from its monday export (see export_year). options are the settings of 
+    the process that started the backfill, worker processes don't inherit them on every platform.
+    """
+    if options: 
+        settings.configure(**options)
+    if year is None: 
+        year = export_year(export_path("Monday", week, folder), week)
+    beginning_of_week, end_of_week = beginning_end_of_week(week, year)
+    #not scheduled MOs completed up to the last export's day are dropped, like a run on that day
+    today = beginning_of_week + timedelta(days = weekday_number+2)
+    LRP_by_day, not_sched_by_day, scheduled_timeline, status, not_scheduled_dict = compute_week(
+        week, weekday_number, beginning_of_week, end_of_week, today, folder)
+    history = pd.concat(status, names = ["Dept", None]).reset_index(level = 0)
+    history.insert(0, "Week", week)
+    history.insert(0, "Year", year)
+    return history.reset_index(drop = True), burn_rates(scheduled_timeline, weekday_number, year, week)
+
+
+def update_dataset(rows, path): 
+    """
+    Write rows of whole weeks to a .csv or .parquet dataset, replacing the rows of those weeks already in it
+
+    Returns
+    -------
+    dataset : dataframe
+        the full dataset, sorted by Year and Week.
+    """
+    if os.path.exists(path): 
+        if path.endswith(".parquet"): 
+            existing = pd.read_parquet(path)
+        else: 
+            existing = pd.read_csv(path)
+        replaced = pd.MultiIndex.from_frame(existing[["Year", "Week"]]).isin(pd.MultiIndex.from_frame(rows[["Year", "Week"]]))
+        rows = pd.concat([existing[~replaced], rows], ignore_index = True) if len(rows) else existing
+    dataset = rows.sort_values(["Year", "Week"], kind = "stable").reset_index(drop = True)
+    if path.endswith(".parquet"): 
+        dataset.to_parquet(path, index = False)
+    else: 
+        dataset.to_csv(path, index = False)
+    return dataset
+
+
+def backfill(export_dir, history_path = "Sch Conf History.csv", max_workers = None, plot_dir = None, year = None): 
+    """
+    Rebuild the status history of every week with exports in export_dir
+
+    Each week uses its exports from monday up to the first missing weekday, and is calculated in its own 
+    process. Weeks that fail are skipped with a warning. Each facility's daily burn rates are also written to 
+    settings.burn_rates_path (None skips them).
+
+    Parameters
+    ----------
+    export_dir : string
+        folder (searched recursively) with the exports of past weeks.
+    history_path : string
+        .csv or .parquet dataset to write, rows of weeks already in it are replaced.
+    max_workers : int
+        number of processes, None uses one per core.
+    plot_dir : string, optional
+        folder to draw the status charts of the weeks calculated to, the summary and each department's chart of 
+        every week (see plots.render_history_plots), on the same number of processes.
+    year : int, optional
+        ISO year of every week, None finds each week's year from its monday export (see export_year).
+
+    Returns
+    -------
+    history : dataframe
+        the full history dataset.
+    """
+    jobs = []
+    for (folder, week), days in sorted(find_weeks(export_dir).items()): 
+        weekday_number = -1
+        while weekday_number < 5 and weekdays[weekday_number+1] in days: 
+            weekday_number += 1
+        if weekday_number < 0: 
+            warnings.warn(f"week {week} in {folder} skipped, it has no monday export")
+            continue
+        jobs.append((folder, week, year, weekday_number))
+
+    weeks, rates = [], []
+    with ProcessPoolExecutor(max_workers = max_workers) as executor: 
+        futures = {job: executor.submit(backfill_week, *job, settings.current()) for job in jobs}
+        for (folder, week, _, weekday_number), future in futures.items(): 
+            try: 
+                history, week_rates = future.result()
+                weeks.append(history)
+                rates.append(week_rates)
+            except Exception as error: 
+                warnings.warn(f"week {week} in {folder} failed - {error!r}")
+
+    if settings.burn_rates_path: 
+        update_dataset(pd.concat(rates, ignore_index = True) if rates else pd.DataFrame(columns = burn_rate_columns), 
+                       settings.burn_rates_path)
+    history = pd.concat(weeks, ignore_index = True) if weeks else pd.DataFrame(columns = ["Year", "Week", "Dept"])
+    if plot_dir is not None: 
+        #plots are only imported when charts are drawn
+        from .plots import render_history_plots
+        render_history_plots(history, plot_dir, max_workers or os.cpu_count())
+    return update_dataset(history, history_path)
@@ -0,0 +1,199 @@
+"""
+Command line
+
+    python -m schedule_conformance status --week 23 --weekday Friday     print each department's % complete
+    python -m schedule_conformance run --week 23 --weekday Saturday      daily run, writes the workbooks and the plot
+    python -m schedule_conformance diff OLD.csv NEW.csv                  changelog between two exports
+    python -m schedule_conformance backfill FOLDER                       rebuild the status history of past weeks
+    python -m schedule_conformance watch --dir FOLDER                    update the reports as each export lands
+    python -m schedule_conformance intraday --week 23 --every 600        hourly status from intra-day exports
+    python -m schedule_conformance reasons FOLDER --from 2025-1          pareto of the returned reasons workbooks
+
+Every command takes --metrics report.json and/or --prometheus FILE.prom to record each stage's time, rows and 
+memory (see metrics), and --profile FOLDER for cProfile stats of the hot functions.
+"""
+
+import argparse
+import time
+
+from . import metrics
+from . import settings
+from .backfill import backfill
+from .snapshots import diff_exports
+from .status import compute_status, compute_week
+from .weeks import beginning_end_of_week, current_week, weekday_name_to_num
+
+
+def weekday_number(name): 
+    number = weekday_name_to_num(name.capitalize())
+    if number is None or number > 5: 
+        raise argparse.ArgumentTypeError(f"expected a weekday from Monday to Saturday, got {name!r}")
+    return number
+
+
+def year_week(text): 
+    try: 
+        year, week = (int(part) for part in text.split("-"))
+    except ValueError: 
+        raise argparse.ArgumentTypeError(f"expected a week as YEAR-WEEK, e.g. 2025-23, got {text!r}")
+    return year, week
+
+
+def week_range_label(start, end): 
+    names = [f"WK{week} {year}" if week else None for year, week in [start or (None, None), end or (None, None)]]
+    if names[0] and names[1]: 
+        return f"{names[0]} to {names[1]}"
+    if names[0] or names[1]: 
+        return f"from {names[0]}" if names[0] else f"to {names[1]}"
+    return "all weeks"
+
+
+def build_parser(): 
+    common = argparse.ArgumentParser(add_help = False)
+    common.add_argument("--cache-dir", default = settings.cache_dir, help = "folder for cached cleaned exports")
+    common.add_argument("--no-cache", action = "store_true", help = "always re-parse every CSV")
+    common.add_argument("--engine", choices = ["vectorized", "rowwise", "compare"], default = settings.calc_engine)
+    common.add_argument("--chunksize", type = int, default = settings.ingest_chunksize, help = "rows per chunk when streaming exports")
+    common.add_argument("--csv-engine", choices = ["c", "pyarrow"], default = settings.csv_engine)
+    common.add_argument("--load-workers", type = int, default = settings.load_workers, 
+                        help = "threads loading the week's exports, default one per export, 1 loads them one after another")
+    common.add_argument("--low-memory", action = "store_true", help = "compact exports for plant-wide weeks (float32 hours and quantities)")
+    common.add_argument("--metrics", metavar = "PATH", help = "write a JSON run report with each stage's time, rows and memory")
+    common.add_argument("--prometheus", metavar = "PATH", help = "write the run's metrics as a Prometheus text file")
+    common.add_argument("--trace-memory", action = "store_true", help = "record each stage's peak memory (slower)")
+    common.add_argument("--profile", metavar = "FOLDER", help = "write cProfile stats of the hot functions to this folder")
+    common.add_argument("--plot-format", nargs = "+", choices = ["png", "svg", "pdf"], default = settings.plot_formats, 
+                        help = "formats to save the charts in")
+    common.add_argument("--plot-workers", type = int, default = settings.plot_workers, 
+                        help = "processes drawing the charts, 0 for one per core")
+
+    week = argparse.ArgumentParser(add_help = False)
+    week.add_argument("--week", type = int, help = "week number in the export file names, default the current ISO week")
+    week.add_argument("--weekday", type = weekday_number, help = "last weekday to include, default today")
+    week.add_argument("--year", type = int, help = "ISO year of the week, default the current year")
+    week.add_argument("--dir", default = ".", help = "folder with the week's exports")
+
+    forecast = argparse.ArgumentParser(add_help = False)
+    forecast.add_argument("--trials", type = int, default = settings.forecast_trials, 
+                          help = "Monte Carlo trials of the mid-week end of week forecast, 0 for no forecast")
+    forecast.add_argument("--burn-rates", default = settings.burn_rates_path, help = "burn rate history the forecast draws from (see backfill)")
+
+    parser = argparse.ArgumentParser(prog = "python -m schedule_conformance", description = "Schedule conformance calculations")
+    commands = parser.add_subparsers(dest = "command", required = True)
+    commands.add_parser("status", parents = [common, week], help = "print each department's status, no workbooks or plots")
+    run = commands.add_parser("run", parents = [common, week, forecast], help = "daily run, writes the workbooks and the status plot")
+    run.add_argument("--no-plot", action = "store_true", help = "don't draw the status plot")
+    run.add_argument("--workers", type = int, default = settings.report_workers, help = "workers writing the workbooks, 1 for one after another")
+    run.add_argument("--pool", choices = ["thread", "process"], default = settings.report_pool, help = "type of workers writing the workbooks")
+    diff = commands.add_parser("diff", parents = [common], help = "changelog of MO operations between two exports")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("-o", "--output", help = "save the changelog to this CSV instead of printing it")
+    history = commands.add_parser("backfill", parents = [common], help = "rebuild the status history of past weeks")
+    history.add_argument("export_dir", help = "folder (searched recursively) with the exports of past weeks")
+    history.add_argument("--history", default = "Sch Conf History.csv", help = ".csv or .parquet dataset to write")
+    history.add_argument("--workers", type = int, help = "processes to use, default one per core")
+    history.add_argument("--year", type = int, help = "ISO year of the weeks, default the year of each week's exports")
+    history.add_argument("--plots", metavar = "FOLDER", help = "also draw each week's status charts to this folder")
+    history.add_argument("--burn-rates", default = settings.burn_rates_path, help = ".csv or .parquet dataset of each facility's daily burn rates")
+    watching = commands.add_parser("watch", parents = [common, forecast], help = "update the status and reports as each daily export lands")
+    watching.add_argument("--dir", default = ".", help = "folder the exports are saved to")
+    watching.add_argument("--interval", type = float, default = 2, help = "seconds between checks of the folder")
+    watching.add_argument("--year", type = int, help = "ISO year of the weeks, default the year of the exports")
+    watching.add_argument("--no-plot", action = "store_true", help = "don't draw the status plot")
+    watching.add_argument("--workers", type = int, default = settings.report_workers, help = "workers writing the workbooks, 1 for one after another")
+    intraday = commands.add_parser("intraday", parents = [common], help = "status at every intra-day snapshot, e.g. hourly exports")
+    intraday.add_argument("--week", type = int, help = "week number in the export file names, default the current ISO week")
+    intraday.add_argument("--year", type = int, help = "ISO year of the week, default the current year")
+    intraday.add_argument("--dir", default = ".", help = "folder with the week's exports")
+    intraday.add_argument("--no-plot", action = "store_true", help = "don't draw the hourly status plot")
+    intraday.add_argument("--every", type = float, help = "check the folder for new snapshots every this many seconds, until interrupted")
+    reasons = commands.add_parser("reasons", parents = [common], help = "read the returned reasons workbooks and write their pareto")
+    reasons.add_argument("folder", help = "folder (searched recursively) with the returned reasons workbooks")
+    reasons.add_argument("--store", default = "Sch Conf Reasons.sqlite", help = "SQLite store of the reasons")
+    reasons.add_argument("--workers", type = int, help = "processes reading workbooks, default one per core")
+    reasons.add_argument("--year", type = int, help = "ISO year of the workbooks named without a year")
+    reasons.add_argument("--from", dest = "start", type = year_week, help = "first week of the pareto as YEAR-WEEK")
+    reasons.add_argument("--to", dest = "end", type = year_week, help = "last week of the pareto as YEAR-WEEK")
+    reasons.add_argument("--dept", nargs = "+", help = "departments in the pareto, default all")
+    reasons.add_argument("--no-plot", action = "store_true", help = "don't draw the pareto charts")
+    return parser
+
+
+def main(argv = None): 
+    args = build_parser().parse_args(argv)
+    settings.configure(cache_dir = None if args.no_cache else args.cache_dir, calc_engine = args.engine, 
+                       ingest_chunksize = args.chunksize, csv_engine = args.csv_engine, 
+                       load_workers = args.load_workers, metrics = bool(args.metrics or args.prometheus), 
+                       metrics_memory = args.trace_memory, profile_dir = args.profile, low_memory = args.low_memory, 
+                       plot_formats = args.plot_format, plot_workers = args.plot_workers or None)
+    metrics.start_run()
+    try: 
+        return run_command(args)
+    finally: 
+        metrics.finish_run(args.metrics, args.prometheus)                  #also written when the run fails
+
+
+def run_command(args): 
+    if args.command == "status": 
+        status = compute_status(args.week, args.weekday, args.year, args.dir)
+        for dept, df in status.items(): 
+            print(dept)
+            print(df.to_string(index = False), end = "\n\n")
+    elif args.command == "run": 
+        #the workbook and plotting modules are only imported for a full run
+        from .reports import write_reports
+        settings.configure(report_workers = args.workers, report_pool = args.pool, forecast_trials = args.trials, 
+                           burn_rates_path = args.burn_rates)
+        year, week, weekday = current_week(args.week, args.weekday, args.year)
+        beginning_of_week, end_of_week = beginning_end_of_week(week, year)
+        rejects = {}
+        LRP_by_day, not_sched_by_day, scheduled_timeline, status, not_scheduled_dict = compute_week(
+            week, weekday, beginning_of_week, end_of_week, export_dir = args.dir, rejects = rejects)
+        if write_reports(week, weekday, scheduled_timeline, status, not_scheduled_dict, plot = not args.no_plot, 
+                         rejects = rejects, year = year, export_dir = args.dir): 
+            return 1                                                    #some reports couldn't be written
+    elif args.command == "diff": 
+        changes = diff_exports(args.old, args.new)
+        if args.output: 
+            changes.to_csv(args.output, index = False)
+            print(changes["Change"].value_counts().to_string())
+        else: 
+            print(changes.to_string())
+    elif args.command == "backfill": 
+        settings.configure(burn_rates_path = args.burn_rates)
+        history = backfill(args.export_dir, args.history, args.workers, args.plots, args.year)
+        print(f"{history.groupby(['Year', 'Week']).ngroups} weeks in {args.history}")
+    elif args.command == "watch": 
+        from .watch import describe_update, watch
+        settings.configure(report_workers = args.workers, forecast_trials = args.trials, burn_rates_path = args.burn_rates)
+        print(f"watching {args.dir} for new exports, ctrl+c to stop", flush = True)
+        try: 
+            watch(args.dir, args.interval, args.year, not args.no_plot, args.metrics, args.prometheus, 
+                  on_update = lambda update: print(describe_update(update), flush = True))
+        except KeyboardInterrupt: 
+            pass
+    elif args.command == "reasons": 
+        from .reasons import ingest_reasons, load_reasons, write_pareto_reports
+        print(f"{ingest_reasons(args.folder, args.store, args.workers, args.year)} new or changed workbooks read into {args.store}")
+        reasons = load_reasons(args.store, args.start, args.end, args.dept)
+        label = week_range_label(args.start, args.end)
+        tables = write_pareto_reports(reasons, label, plot = not args.no_plot)
+        print(tables["All"].to_string(index = False))
+    elif args.command == "intraday": 
+        from .intraday import compute_intraday, status_tables, write_intraday_reports
+        state = None
+        try: 
+            while True: 
+                last, snapshots = state, len(state["snapshots"]) if state else 0
+                state = compute_intraday(args.week, args.year, args.dir, state = state)
+                if len(state["snapshots"]) > (snapshots if state is last else 0):      #a new week starts a new state
+                    write_intraday_reports(state, plot = not args.no_plot)
+                    for dept, df in status_tables(state).items(): 
+                        print(dept, df.iloc[-2:].to_string(index = False), sep = "\n", end = "\n\n", flush = True)
+                if args.every is None: 
+                    break
+                time.sleep(args.every)
+        except KeyboardInterrupt: 
+            pass
+    return 0
@@ -0,0 +1,70 @@
+"""
+Facilities included in schedule conformance and the department of each
+"""
+
+import numpy as np
+import pandas as pd
+
+
+#define department for each facility included in schedule conformance
+#the department and facility lists below are built from this, so add new facilities/work centers here only
+facility_departments = {"MACH51": "DeptD", "MACH52": "DeptD", "MACH53": "DeptD", "MACH54": "DeptD", "MACH55": "DeptD", 
+                        "MACH57": "DeptD", "MACH58": "DeptD", 
+                        "MACH48": "DeptE", "MACH49": "DeptE", "MACH50": "DeptE", 
+                        "MACH47": "DeptF", "MACH56": "DeptF", "MACH59": "DeptF", "MACH60": "DeptF", "MACH61": "DeptF", 
+                        "MACH63": "DeptF", 
+                        "MACH62": "DeptL", 
+                        "MACH2": "DeptB", "MACH5": "DeptB", "MACH14": "DeptB", "MACH15": "DeptB", "MACH16": "DeptB", 
+                        "MACH17": "DeptB", "MACH18": "DeptB", "MACH19": "DeptB", "MACH20": "DeptB", "MACH99": "DeptB"}
+
+#facilities included in schedule conformance, and the facilities in each department (in order of first appearance above)
+sch_conf_facilities = list(facility_departments)
+dept_facilities = {}
+for facility, dept in facility_departments.items(): 
+    dept_facilities.setdefault(dept, []).append(facility)
+
+facility_dtype = pd.CategoricalDtype(sch_conf_facilities)    #same categories every day so frames from different days line up
+
+
+def configure_departments(mapping): 
+    """
+    Replace the facility to department map and the lists built from it (in this process), e.g. for synthetic exports
+
+    Parameters
+    ----------
+    mapping : dictionary
+        facility as the key and its department as the value, like facility_departments.
+    """
+    global facility_dtype
+    mapping = dict(mapping)
+    facility_departments.clear()                     #updated in place, so modules that imported them see the new map
+    facility_departments.update(mapping)
+    sch_conf_facilities[:] = list(mapping)
+    dept_facilities.clear()
+    for facility, dept in mapping.items(): 
+        dept_facilities.setdefault(dept, []).append(facility)
+    facility_dtype = pd.CategoricalDtype(sch_conf_facilities)
+
+
+def split_by_dept(df):
+    """
+    Split dataframe into multiple dataframes by department
+    
+    Parameters: 
+    df (dataframe) 
+    works with facility_departments dictionary which has the facility as the keys and its department as the values
+    
+    Returs a dictionary with the department as the keys (every department in dept_facilities, in that order), 
+    and the df for that department as the value
+    
+    """
+    
+    dept_codes = df["Facility"].map(facility_departments)                         #look up every row's department once
+    positions = df.groupby(dept_codes, sort = False, observed = True).indices      #row positions of each department, in one pass
+    no_rows = np.array([], dtype = np.intp)
+    dept_dict = {}
+    for key in dept_facilities: 
+        part = df.iloc[positions.get(key, no_rows)]
+        part.index = pd.RangeIndex(len(part))                                      #new index without copying the rows again
+        dept_dict[key] = part
+    return dept_dict
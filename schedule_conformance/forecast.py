@@ -0,0 +1,204 @@
+"""
+End of week forecast
+
+On a mid-week run, forecast_week projects each department's % MOs and % hours complete through the rest of the
+week. A facility's burn rate is the share of its remaining scheduled machine hours completed in a day. Each Monte
+Carlo trial draws a burn rate for every remaining day and facility from that facility's observed rates (this week's
+days, and the history of past weeks written by backfill), burns that share of the facility's remaining hours, and
+completes the facility's open operations oldest MO first (MO number, then OP Seq) as far as the burned hours reach.
+Every trial, day, facility and department is simulated at once with numpy arrays, 5000 trials of a plant-wide week 
+(hundreds of facilities) take a fraction of a second.
+
+The forecast is written to the Forecast sheet of the status workbook from monday (drawn from the history alone) and 
+drawn on the status plot from tuesday, the first day with progress to draw it from (see reports).
+
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import metrics, settings
+from .departments import dept_facilities, facility_departments
+from .snapshots import snapshot_status
+from .weeks import weekdays
+
+
+forecast_columns = ["Dept", "Weekday", "% MOs Complete", "% MOs Low", "% MOs High", "% Hrs Complete", "% Hrs Low", 
+                    "% Hrs High", "Chance Complete"]
+
+
+def facility_hours(timeline, weekday_number): 
+    """
+    Machine hours remaining of each facility in the snapshots of a scheduled timeline up to weekday_number
+
+    Returns
+    -------
+    hours : dataframe
+        indexed by facility, one column per snapshot.
+    """
+    days = weekdays[:weekday_number+1]                          #later snapshots are allocated, but empty
+    present = timeline["Qty Rem"][days].notna()
+    hours = timeline["Mach hrs rem"][days].where(present, 0).fillna(0)
+    return hours.groupby(timeline["Facility"].astype(object)).sum()
+
+
+def burn_rates(timeline, weekday_number, year = None, week = None): 
+    """
+    Daily burn rate of each facility in a scheduled timeline
+
+    Parameters
+    ----------
+    timeline : dataframe
+        scheduled timeline (see compute_week).
+    weekday_number : int
+        number of the last weekday in the timeline.
+    year, week : int, optional
+        added as the first columns, for the burn rate history.
+
+    Returns
+    -------
+    rates : dataframe
+        one row per facility and weekday with hours remaining at the start of the day, columns: Facility, Weekday, 
+        Start hours, Hours burned (start hours less the next snapshot's) and Burn rate (hours burned / start hours, 
+        from 0 to 1). Days without hours remaining are left out.
+    """
+    hours = facility_hours(timeline, weekday_number)
+    start, end = hours.iloc[:, :-1].to_numpy(), hours.iloc[:, 1:].to_numpy()
+    rates = pd.DataFrame({"Facility": np.repeat(hours.index.to_numpy(), start.shape[1]), 
+                          "Weekday": np.tile(hours.columns[:-1].to_numpy(), len(hours)), 
+                          "Start hours": start.ravel(), "Hours burned": (start - end).ravel()})
+    rates = rates[rates["Start hours"] > 0].reset_index(drop = True)
+    rates["Burn rate"] = (rates["Hours burned"] / rates["Start hours"]).clip(0, 1)    #hours can go up, e.g. rework
+    if week is not None: 
+        rates.insert(0, "Week", week)
+    if year is not None: 
+        rates.insert(0, "Year", year)
+    return rates
+
+
+def load_burn_rates(path = None): 
+    """
+    Burn rate history (.csv or .parquet, written by backfill), None if there is none
+
+    path defaults to settings.burn_rates_path.
+    """
+    path = path or settings.burn_rates_path
+    if not path or not os.path.exists(path): 
+        return None
+    if path.endswith(".parquet"): 
+        return pd.read_parquet(path, columns = ["Facility", "Burn rate"])
+    return pd.read_csv(path, usecols = ["Facility", "Burn rate"])
+
+
+def rate_pools(observed, facilities): 
+    """
+    Burn rates to draw from for each facility: its own, else its department's, else every facility's
+
+    Returns
+    -------
+    values, offsets, lengths : arrays
+        every pool one after another, and the start and length of each facility's pool.
+    """
+    rates = observed.dropna(subset = ["Burn rate"])
+    rates = rates.assign(Dept = rates["Facility"].map(facility_departments))
+    by_facility = {facility: group.to_numpy() for facility, group in rates.groupby("Facility")["Burn rate"]}
+    by_dept = {dept: group.to_numpy() for dept, group in rates.groupby("Dept")["Burn rate"]}
+    everything = rates["Burn rate"].to_numpy()
+    pools = [by_facility.get(facility, by_dept.get(facility_departments[facility], everything)) for facility in facilities]
+    lengths = np.array([len(pool) for pool in pools])
+    return np.concatenate(pools), np.cumsum(lengths) - lengths, lengths
+
+
+def forecast_week(timeline, weekday_number, history = None, trials = None, band = .8, seed = 0, resolution = 1000): 
+    """
+    Monte Carlo forecast of each department's % MOs and % hours complete through the rest of the week
+
+    Parameters
+    ----------
+    timeline : dataframe
+        scheduled timeline (see compute_week), snapshots after weekday_number aren't used.
+    weekday_number : int
+        number of the last weekday in the timeline, the forecast starts with that day's work.
+    history : dataframe, optional
+        past burn rates with Facility and Burn rate columns (see load_burn_rates), drawn from with the week's own.
+    trials : int
+        number of trials, None uses settings.forecast_trials.
+    band : float
+        share of the trials within the low and high columns, e.g. .8 for the 10th to the 90th percentile.
+    seed : int
+        seed of the random numbers, the same inputs give the same forecast.
+    resolution : int
+        steps of each facility's hours the operations completed are counted at, an operation is counted once the 
+        step before its cumulative hours is burned.
+
+    Returns
+    -------
+    forecast : dataframe
+        one row per department and remaining weekday up to friday (progress through that day, like the status
+        rows), columns: Dept, Weekday, the median % MOs and % Hrs Complete of the trials, their low and high
+        percentiles, and Chance Complete (% of trials with every MO of the department's monday list complete).
+        Empty on saturday, or when there are no burn rates to draw from (a monday without history).
+    """
+    if trials is None: 
+        trials = settings.forecast_trials
+    days = 5 - weekday_number
+    if days <= 0 or not trials: 
+        return pd.DataFrame(columns = forecast_columns)
+    day = weekdays[weekday_number]
+    observed = burn_rates(timeline, weekday_number)
+    observed = observed[observed["Weekday"].isin(weekdays[:weekday_number])]
+    if history is not None: 
+        observed = pd.concat([observed, history[["Facility", "Burn rate"]]], ignore_index = True)
+    if observed["Burn rate"].isna().all(): 
+        return pd.DataFrame(columns = forecast_columns)
+
+    with metrics.stage("forecast", rows_in = len(timeline)) as record: 
+        depts = list(dept_facilities)
+        facilities = [facility for dept in depts for facility in dept_facilities[dept]]     #each department's together
+        dept_first = np.cumsum([0] + [len(dept_facilities[dept]) for dept in depts[:-1]])
+        #open operations, grouped by facility with the oldest MO first
+        ops = timeline[timeline[("Qty Rem", day)].notna()].sort_index()
+        codes = pd.Index(facilities).get_indexer(ops["Facility"])
+        by_facility = np.argsort(codes, kind = "stable")
+        codes = codes[by_facility]
+        hours = ops[("Mach hrs rem", day)].fillna(0).clip(lower = 0).to_numpy()[by_facility]
+        cumulative = np.cumsum(hours)
+        counts = np.bincount(codes, minlength = len(facilities))
+        first = np.cumsum(counts) - counts
+        remaining = np.bincount(codes, weights = hours, minlength = len(facilities))
+        starts = np.concatenate([[0], cumulative])[first]         #hours of the facilities before each one
+
+        #operations completed once a share of the facility's hours is burned (cumulative hours within it), 
+        #looked up in a table at every 1/resolution of its hours instead of searching every trial's hours
+        edges = starts[:, None] + remaining[:, None] * np.arange(resolution + 1) / resolution
+        completed = np.clip(np.searchsorted(cumulative, edges, side = "left") - first[:, None], 0, counts[:, None])
+        completed[:, -1] = counts
+
+        #share of each facility's hours left at the end of each remaining day, shape (trials, days, facilities)
+        values, offsets, lengths = rate_pools(observed, facilities)
+        rng = np.random.default_rng(seed)
+        picks = offsets + (rng.random((trials, days, len(facilities)), dtype = np.float32) * lengths).astype(np.intp)
+        kept = np.cumprod(1 - values.astype(np.float32)[picks], axis = 1)
+        done = completed.ravel()[np.arange(len(facilities)) * (resolution + 1) + ((1 - kept) * resolution).astype(np.intp)]
+
+        monday_counts, monday_hours = snapshot_status(timeline, "Monday")
+        monday_counts, monday_hours = monday_counts.to_numpy(float), monday_hours.to_numpy(float)
+        open_mos = np.add.reduceat(counts - done, dept_first, axis = 2)
+        hours_left = np.add.reduceat(remaining * kept, dept_first, axis = 2)
+        with np.errstate(divide = "ignore", invalid = "ignore"): 
+            projected = {"MOs": (monday_counts - open_mos) / monday_counts * 100, 
+                         "Hrs": (monday_hours - hours_left) / monday_hours * 100}
+
+        forecast = pd.DataFrame({"Dept": np.repeat(depts, days), "Weekday": np.tile(weekdays[weekday_number:5], len(depts))})
+        quantiles = [(1 - band) / 2, .5, (1 + band) / 2]
+        for name, percent in projected.items(): 
+            low, median, high = np.quantile(percent, quantiles, axis = 0)            #each (days, departments)
+            forecast[f"% {name} Complete"] = median.T.ravel().round(2)
+            forecast[f"% {name} Low"] = low.T.ravel().round(2)
+            forecast[f"% {name} High"] = high.T.ravel().round(2)
+        chance = np.where(monday_counts > 0, (open_mos == 0).mean(axis = 0) * 100, np.nan)
+        forecast["Chance Complete"] = chance.T.ravel().round(1)
+        record["rows_out"] = len(forecast)
+    return forecast[forecast_columns]
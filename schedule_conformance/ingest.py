@@ -0,0 +1,395 @@
+"""
+Reading, cleaning and caching the daily XA exports
+"""
+
+import os
+import glob
+import hashlib
+import tempfile
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from . import settings
+from . import departments
+from . import metrics
+
+
+def parse_date(date_series): 
+    """
+    function to parse strings to datetime in either m/d/yy or m/d/yyyy format, in one pass
+
+    Each distinct value is only parsed once, and a column with both formats is parsed row by row 
+    instead of being lost. Two digit years follow the same rule as '%y' (69-99 are 1900s).
+
+    Parameters
+    ----------
+    date_series : series
+        column of date strings.
+
+    Returns
+    -------
+    parsed : series
+        datetime column, NaT where the value is missing or couldn't be parsed.
+    """
+    if pd.api.types.is_datetime64_any_dtype(date_series): 
+        return date_series
+    codes, uniques = pd.factorize(date_series)                       #missing values get code -1
+    if len(uniques) == 0: 
+        return pd.Series(pd.NaT, index = date_series.index, dtype = "datetime64[ns]")
+    parts = pd.Series(uniques).astype(str).str.extract(r"^\s*(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})\s*$")
+    year = pd.to_numeric(parts[2])
+    short_year = parts[2].str.len() == 2
+    year = year.where(~short_year, year + np.where(year < 69, 2000, 1900))
+    parsed = pd.to_datetime(pd.DataFrame({"year": year, "month": pd.to_numeric(parts[0]), "day": pd.to_numeric(parts[1])}), 
+                            errors = "coerce").to_numpy()
+    values = np.where(codes >= 0, parsed[codes], np.datetime64("NaT", "ns"))
+    return pd.Series(values, index = date_series.index, dtype = "datetime64[ns]")
+
+
+#declared schema of the XA export. "number" columns may contain thousands separators, 
+#"date" columns are m/d/yy or m/d/yyyy text parsed by parse_date
+export_schema = {"Facility": "category", "Department": "category", "Order": "text", "Item": "text", "Item Description": "text", 
+                 "OP Seq": "integer", "Start Date": "date", "Actual Start Date": "date", "Complete Date": "date", 
+                 "Actual Completion Date": "date", "Due date": "date", "MOP  QTY Remaining": "number", "OP Status": "category", 
+                 "MO Qty Remaining": "number", "Mach Hrs Remaining": "number", "Labor Hrs Remaining": "number", 
+                 "Hours Remaining": "number", "Last Activity Date": "date"}
+schema_dtypes = {"text": "object", "category": "category", "integer": "Int64", "number": "float64", "date": "object"}
+export_dtypes = {col: schema_dtypes[kind] for col, kind in export_schema.items()}   #dtypes the export is read with
+
+#low memory mode (settings.low_memory): text is parsed straight into categoricals (each distinct value is parsed once, 
+#then interned, see intern_text), numbers as float32, and the columns no calculation uses aren't read
+compact_schema_dtypes = {"text": "category", "category": "category", "integer": "Int32", "number": "float32", "date": "category"}
+unused_export_columns = ["Start Date", "Actual Start Date", "Due date", "Labor Hrs Remaining", "Hours Remaining"]
+compact_export_dtypes = {col: compact_schema_dtypes[kind] for col, kind in export_schema.items() if col not in unused_export_columns}
+
+
+def to_number(series): 
+    """
+    Convert a column to numbers, removing thousands separators if it was read as text
+    """
+    if series.dtype == object: 
+        series = series.str.replace(",", "", regex = False)
+    return pd.to_numeric(series)
+
+
+@metrics.profiled
+def df_cleaning(df, rejects = None): 
+    """
+    Funtion to clean raw export data
+    
+    Parameters
+    ----------
+    df : dataframe
+        XA export of scheduled operations.
+    rejects : list, optional
+        if given, a df of the date values that couldn't be parsed is appended to it.
+
+    Returns
+    -------
+    df : dataframe
+        cleaned dataframe,subsetted to only schedule conformance facilities, 
+        renamed columns, columns converted to appropriate format, .
+    """
+    new_names = {"Department": "Dept", "Item Description": "Description", "Start Date": "Sch start", 
+                 "Actual Start Date": "Act start", "Complete Date": "Sch comp", "Actual Completion Date": "Act comp", 
+                 "MOP  QTY Remaining": "Qty Rem", "MO Qty Remaining": "Qty Rem MO", "Last Activity Date": "Last activity", "Due date": "Due", 
+                "Mach Hrs Remaining": "Mach hrs rem", "Labor Hrs Remaining": "Labor hrs rem"}
+    with metrics.stage("clean", rows_in = len(df)) as record: 
+        df = df.rename(columns = new_names)             
+        df = df[df["Facility"].isin(departments.sch_conf_facilities)]
+        metrics.count("schedule conformance facilities", record["rows_in"], len(df))
+        #df = df[~df["Order"].isin(mos_to_remove)]
+        cols_to_numeric = ["Qty Rem", "Qty Rem MO", "Mach hrs rem", "Labor hrs rem", "Hours Remaining"]  #convert numeric columns to numbers from objects
+        df = df.assign(**{col: to_number(df[col]) for col in cols_to_numeric if col in df})   #only numeric columns have thousands separators removed
+        df["Facility"] = df["Facility"].astype(departments.facility_dtype)
+        for col in ["Dept", "OP Status"]:                               #only the kept rows' values, read in one pass or in chunks
+            df[col] = df[col].astype("category").cat.remove_unused_categories()
+        cols_to_date = ["Sch start", "Act start", "Sch comp", "Act comp", "Due", "Last activity"]
+        for col in [col for col in cols_to_date if col in df]:     #unused columns aren't read in low memory mode
+            parsed = parse_date(df[col])
+            rejected = df[col].notna() & parsed.isna()
+            if rejects is not None and rejected.any(): 
+                rejects.append(pd.DataFrame({"Line": df.index[rejected] + 2, "Order": df.loc[rejected, "Order"],  #line number in the CSV file
+                                             "Column": col, "Value": df.loc[rejected, col]}))
+            df[col] = parsed
+        if settings.low_memory: 
+            df = compact_export(df)
+        record["rows_out"] = len(df)
+    return df
+
+
+#columns of the cleaned export that no calculation uses and types of the others in low memory mode
+unused_columns = ["Sch start", "Act start", "Due", "Labor hrs rem", "Hours Remaining"]
+compact_dtypes = {"OP Seq": "Int32", "Qty Rem": "float32", "Qty Rem MO": "float32", "Mach hrs rem": "float32"}
+
+def compact_export(df): 
+    """
+    Compact a cleaned export for low memory mode (settings.low_memory)
+
+    Exports that weren't read with compact_export_dtypes (e.g. chunks or pyarrow's parser) are converted, and 
+    the text is interned (see intern_text).
+    """
+    return intern_text(df.drop(columns = unused_columns, errors = "ignore").astype(compact_dtypes))
+
+
+#text of the exports read so far in low memory mode, each order, item and description is kept as one string object
+interned_text = {}
+interned_limit = 5000000                #emptied when it gets this big, e.g. in a long running watch
+
+def intern_text(df): 
+    """
+    Make the text columns (Order, Item, Description) object columns of the same string objects as the exports read before
+
+    Every day's export repeats most of the week's orders, items and descriptions, so the week's frames 
+    (LRP_by_day, not_sched_by_day and the timelines) share one copy of each instead of one per row and day. 
+    Categoricals would keep every day's categories in each frame sliced from it, and need their categories 
+    lined up to compare days.
+    """
+    if len(interned_text) > interned_limit: 
+        interned_text.clear()
+    for col in ["Order", "Item", "Description"]: 
+        if isinstance(df[col].dtype, pd.CategoricalDtype): 
+            codes, texts = df[col].cat.codes.to_numpy(), df[col].cat.categories
+        else: 
+            codes, texts = pd.factorize(df[col])
+        shared = np.array([interned_text.setdefault(text, text) for text in texts] + [np.nan], dtype = object)
+        df[col] = shared[codes]                                             #missing values have code -1, the NaN at the end
+    return df
+
+
+def widen_float32(df): 
+    """
+    float32 columns (low memory mode) as float64 with the digits they were read with, 12.34 instead of 12.340000152587891, 
+    so sums and differences come out the same as from a float64 export
+    """
+    narrow = [col for col in df.columns if df[col].dtype == np.float32]
+    if not narrow: 
+        return df
+    widened = {}
+    for col in narrow: 
+        distinct, positions = np.unique(df[col].to_numpy(), return_inverse = True)     #each distinct value is converted once
+        widened[col] = distinct.astype(str).astype("float64")[positions]
+    return df.assign(**widened)
+
+
+def read_dtypes(): 
+    """
+    Dtypes (and columns) the export is read with in the current mode
+    """
+    return compact_export_dtypes if settings.low_memory else export_dtypes
+
+
+def read_export_chunked(path, chunksize, rejects = None): 
+    """
+    Stream an export in chunks, keeping only schedule conformance facilities
+
+    Each chunk is read with only the export columns and explicit dtypes (thousands separators 
+    are handled by the parser for the numeric columns), and other facilities are dropped before 
+    anything else is done with it, so peak memory scales with the kept rows instead of the file size.
+
+    Parameters
+    ----------
+    path : string
+        path of the CSV export.
+    chunksize : int
+        number of rows to read per chunk.
+    rejects : list, optional
+        passed to df_cleaning.
+
+    Returns
+    -------
+    df : dataframe
+        cleaned dataframe, as returned by df_cleaning.
+    """
+    #chunks are read as usual (categoricals of each chunk would differ), low memory mode only leaves out the unused columns
+    dtypes = {col: export_dtypes[col] for col in read_dtypes()}
+    reader = pd.read_csv(path, usecols = list(dtypes), dtype = dtypes, thousands = ",", chunksize = chunksize)
+    kept = []
+    rows = 0
+    with reader: 
+        for chunk in reader: 
+            rows += len(chunk)
+            kept.append(chunk[chunk["Facility"].isin(departments.sch_conf_facilities)])
+    metrics.count("schedule conformance facilities", rows, sum(len(chunk) for chunk in kept))
+    if not kept:                                                           #export with only a header
+        return df_cleaning(pd.read_csv(path, usecols = list(dtypes), dtype = dtypes, nrows = 0), rejects)
+    return df_cleaning(pd.concat(kept), rejects)
+
+
+def record_rejects(path, rejected, rejects = None): 
+    """
+    Warn about the date values of an export that couldn't be parsed, and store them in rejects (a dictionary, 
+    export file name as the key and a df with the line, order, column and value of each rejected value as the value)
+    """
+    if rejects is not None: 
+        rejects[os.path.basename(path)] = rejected
+    warnings.warn(f"{len(rejected)} date values in {path} could not be parsed and were left empty")
+
+
+def read_export(path, rejects = None): 
+    """
+    Read and clean an export with the declared schema, streamed in chunks if ingest_chunksize is set
+
+    Date values that couldn't be parsed are reported with a warning, and stored in rejects if it's given (see record_rejects).
+    """
+    found = []
+    dtypes = read_dtypes()
+    with metrics.stage("read export", file = os.path.basename(path)) as record: 
+        if settings.ingest_chunksize: 
+            df = read_export_chunked(path, settings.ingest_chunksize, found)
+        elif settings.csv_engine == "pyarrow": 
+            #the pyarrow parser can't remove thousands separators, so number columns are left to its type inference 
+            #(columns with separators come back as text) and converted in df_cleaning
+            text_dtypes = {col: dtype for col, dtype in dtypes.items() if export_schema[col] not in ("number", "integer")}
+            df = df_cleaning(pd.read_csv(path, engine = "pyarrow", usecols = list(dtypes), dtype = text_dtypes), found)
+        else: 
+            df = df_cleaning(pd.read_csv(path, usecols = list(dtypes), dtype = dtypes, thousands = ","), found)
+        record["rows_out"] = len(df)
+        metrics.footprint("cleaned export", df)
+    if found: 
+        record_rejects(path, pd.concat(found, ignore_index = True), rejects)
+    return df
+
+
+CACHE_VERSION = 6   #bump whenever df_cleaning changes so stale cached frames are rebuilt
+
+def export_cache_key(path, hash_contents = False): 
+    """
+    Build the cache key for an export file
+
+    Parameters
+    ----------
+    path : string
+        path of the CSV export.
+    hash_contents : bool
+        hash the file contents instead of using the modified time (for shares where mtime is unreliable).
+
+    Returns
+    -------
+    key : string
+        short hex digest of the path, size and modified time/contents of the file, and the facilities kept by df_cleaning.
+    """
+    stat = os.stat(path)
+    key = hashlib.blake2b(digest_size = 8)
+    key.update(f"{CACHE_VERSION}|{os.path.abspath(path)}|{stat.st_size}|".encode())
+    key.update(repr(list(departments.facility_departments.items())).encode())   #editing the facility map re-cleans the exports
+    if settings.low_memory: 
+        key.update(b"|low memory")                                               #compact frames are cached separately
+    if hash_contents: 
+        with open(path, "rb") as file: 
+            for block in iter(lambda: file.read(1 << 20), b""): 
+                key.update(block)
+    else: 
+        key.update(str(stat.st_mtime_ns).encode())
+    return key.hexdigest()
+
+
+def load_clean_export(path, hash_contents = False, rejects = None): 
+    """
+    Read and clean one export, reusing the cached cleaned frame when the export hasn't changed
+
+    Cleaned frames are stored as uncompressed feather files in cache_dir so they can be memory-mapped 
+    on load, with the export's rejected date values next to them, so a cached export reports the same 
+    rejects as parsing it. Replacing an export changes its size/modified time, which changes the key, so the 
+    stale entries are removed and the new CSV goes through df_cleaning. The file names have a hash of the 
+    export's folder, exports with the same name in other folders (e.g. every year of a backfill) keep their own 
+    entries, and several processes can cache the same export at once. 
+    Falls back to parsing the CSV every time if cache_dir is None or pyarrow is not installed.
+
+    Parameters
+    ----------
+    path : string
+        path of the CSV export.
+    hash_contents : bool
+        passed to export_cache_key.
+    rejects : dictionary, optional
+        the export's date values that couldn't be parsed are stored in it, see record_rejects.
+
+    Returns
+    -------
+    df : dataframe
+        cleaned dataframe, same as read_export(path).
+    """
+    try: 
+        import pyarrow as pa
+        from pyarrow import feather
+    except ImportError: 
+        pa = None
+    if settings.cache_dir is None or pa is None: 
+        return read_export(path, rejects)
+
+    stem = os.path.splitext(os.path.basename(path))[0]
+    stem += "." + hashlib.blake2b(os.path.abspath(path).encode(), digest_size = 4).hexdigest()     #one set of entries per export
+    key = export_cache_key(path, hash_contents)
+    cache_file = os.path.join(settings.cache_dir, f"{stem}.{key}.feather")
+    rejects_file = os.path.join(settings.cache_dir, f"{stem}.{key}.rejects.feather")   #only when there are rejects
+    if os.path.exists(cache_file): 
+        with metrics.stage("load cached export", file = os.path.basename(path)) as record: 
+            df = feather.read_table(cache_file, memory_map = True).to_pandas()
+            if settings.low_memory: 
+                df = intern_text(df)
+            record["rows_out"] = len(df)
+        if os.path.exists(rejects_file): 
+            record_rejects(path, feather.read_feather(rejects_file), rejects)
+        return df
+
+    found = {}
+    df = read_export(path, found)
+    if rejects is not None: 
+        rejects.update(found)
+    os.makedirs(settings.cache_dir, exist_ok = True)
+    for old_file in glob.glob(os.path.join(glob.escape(settings.cache_dir), glob.escape(stem) + ".*.feather")): 
+        if old_file not in (cache_file, rejects_file):                       #export was replaced, drop the stale entries
+            try: 
+                os.remove(old_file)
+            except FileNotFoundError:                                        #another process removed it first
+                pass
+    #the rejects are published before the frame, a cached frame always has its rejects
+    for table, file in [(found.get(os.path.basename(path)), rejects_file), (df, cache_file)]: 
+        if table is not None: 
+            descriptor, temp_file = tempfile.mkstemp(suffix = ".tmp", dir = settings.cache_dir)   #one per writer
+            os.close(descriptor)
+            try: 
+                feather.write_feather(pa.Table.from_pandas(table, preserve_index = True), temp_file, compression = "uncompressed")
+                os.replace(temp_file, file)                                  #only publish complete cache files
+            finally: 
+                if os.path.exists(temp_file): 
+                    os.remove(temp_file)
+    return df
+
+
+def load_exports(paths, max_workers = None, rejects = None): 
+    """
+    Load several exports at the same time (see load_clean_export), in the order of paths
+
+    Each export is read and cleaned on its own thread: reading from a network share is mostly waiting and 
+    pandas parses CSVs with the GIL released, and the cleaned frames don't have to be copied back from 
+    other processes. Exports are handed out in order as soon as they and the ones before them are loaded, 
+    so the day by day filtering against monday's list can start while later days are still loading.
+
+    Parameters
+    ----------
+    paths : list
+        paths of the CSV exports.
+    max_workers : int
+        threads loading exports, None uses settings.load_workers (one per export when that is None), 
+        1 loads them one after another on this thread.
+    rejects : dictionary, optional
+        passed to load_clean_export.
+
+    Returns
+    -------
+    exports : iterator
+        cleaned export of each path, in order. An export that can't be loaded raises its error when it's reached.
+    """
+    workers = max_workers or settings.load_workers or len(paths)
+    load = partial(load_clean_export, rejects = rejects)
+    if workers == 1 or len(paths) <= 1: 
+        yield from map(load, paths)
+        return
+    with ThreadPoolExecutor(max_workers = min(workers, len(paths))) as executor: 
+        yield from executor.map(load, paths)
@@ -0,0 +1,186 @@
+"""
+Intra-day snapshots
+
+For progress during the shift, XA can be exported several times a day, e.g. hourly, as
+'Monday Sched Conform WK23 0900.csv' (weekday, week and the time of the pull as HHMM). A daily export without
+a time is that day's snapshot at midnight. Snapshots are keyed by their timestamp instead of the weekday.
+
+The week's scheduled list is set by its first snapshot, like monday's export in the daily calculations. The
+state of the week holds the current qty and hours of each scheduled MO operation and each department's totals, 
+so a new snapshot only updates the operations that changed since the previous one (and the totals by their
+difference), and fills in the progress of the previous row of each department's status. Apart from reading
+the new export and matching it with the previous one, a snapshot costs in proportion to what changed, not to
+the number of snapshots so far.
+
+The status tables have the same columns as the daily ones with a Snapshot timestamp instead of the Weekday:
+the progress of a row is the progress up to the next snapshot, so the latest row has none yet. They are
+written to 'Sch Conf Status Hourly WK23.xlsx' and plotted over time in 'Status Week 23 Hourly.png'.
+"""
+
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .departments import dept_facilities, facility_departments
+from .ingest import load_clean_export, widen_float32
+from .snapshots import diff_snapshots, scheduled_attributes, scheduled_measures, timeline_keys
+from .status import split_day
+from .weeks import beginning_end_of_week, current_week, weekdays
+
+
+snapshot_pattern = re.compile(r"^(" + "|".join(weekdays) + r") Sched Conform Wk(\d+)(?: (\d{2})(\d{2}))?\.csv$", re.IGNORECASE)
+
+
+def find_snapshots(export_dir, week, year): 
+    """
+    Snapshots of a week in a folder, daily and intra-day exports
+
+    Returns
+    -------
+    snapshots : list
+        (timestamp, path) of each snapshot, in time order.
+    """
+    beginning_of_week = beginning_end_of_week(week, year)[0]
+    snapshots = []
+    for file in os.listdir(export_dir): 
+        match = snapshot_pattern.match(file)
+        if match and int(match.group(2)) == week: 
+            day = weekdays.index(match.group(1).capitalize())
+            hour, minute = (int(match.group(3)), int(match.group(4))) if match.group(3) else (0, 0)
+            timestamp = beginning_of_week + pd.Timedelta(days = day+1, hours = hour, minutes = minute)
+            snapshots.append((timestamp, os.path.join(export_dir, file)))
+    return sorted(snapshots)
+
+
+def new_intraday_state(week, year): 
+    """
+    Empty state of a week's intra-day snapshots, see add_snapshot_at
+    """
+    beginning_of_week, end_of_week = beginning_end_of_week(week, year)
+    return {"week": week, "year": year, "beginning_of_week": beginning_of_week, "end_of_week": end_of_week, 
+            "snapshots": [], "first_scheduled": None, "previous": None, "current": None, 
+            "totals": {key: [0, 0.0] for key in dept_facilities}, "status": {key: [] for key in dept_facilities}}
+
+
+def add_snapshot_at(state, timestamp, df, today = None): 
+    """
+    Add a snapshot to a week's intra-day state
+
+    Parameters
+    ----------
+    state : dictionary
+        week's state from new_intraday_state, timestamp has to be after its last snapshot.
+    timestamp : timestamp
+        time of the snapshot.
+    df : dataframe
+        cleaned export of the snapshot.
+    today : timestamp
+        passed to split_day.
+    """
+    with metrics.stage("intraday snapshot", rows_in = len(df), snapshot = str(timestamp)) as record: 
+        scheduled = split_day(weekdays[timestamp.weekday()], df, state["first_scheduled"], state["beginning_of_week"], 
+                              state["end_of_week"], today)[0]
+        changes = diff_snapshots(state["previous"], scheduled, scheduled_measures, scheduled_attributes)
+        changes = changes.drop_duplicates(timeline_keys).set_index(timeline_keys)
+        after = widen_float32(changes[[measure + " new" for measure in scheduled_measures]].set_axis(scheduled_measures, axis = 1))
+        if state["current"] is None: 
+            #the first snapshot sets the week's scheduled list, every operation in it is added
+            state["first_scheduled"] = scheduled
+            state["current"] = after.assign(Dept = changes["Facility"].map(facility_departments).to_numpy())
+            before = after.iloc[:0]
+            depts = state["current"]["Dept"]
+        else: 
+            #operations that aren't on the scheduled list are ignored, like in update_status
+            known = changes.index.intersection(state["current"].index, sort = False)
+            before = state["current"].loc[known, scheduled_measures]
+            after = after.loc[known]
+            depts = state["current"].loc[known, "Dept"]
+            state["current"].loc[known, scheduled_measures] = after
+        state["previous"] = scheduled
+
+        #department totals change by the difference of the changed operations
+        def totals(values): 
+            present = values["Qty Rem"].notna()
+            return present.groupby(depts.loc[values.index]).sum(), values["Mach hrs rem"].where(present).groupby(depts.loc[values.index]).sum()
+        counts_after, hours_after = totals(after)
+        counts_before, hours_before = totals(before)
+        for key in dept_facilities: 
+            state["totals"][key][0] += int(counts_after.get(key, 0)) - int(counts_before.get(key, 0))
+            state["totals"][key][1] += hours_after.get(key, 0.0) - hours_before.get(key, 0.0)
+            add_status_row(state["status"][key], timestamp, *state["totals"][key])
+        state["snapshots"].append(timestamp)
+        record["rows_out"] = len(changes)
+
+
+def add_status_row(rows, timestamp, count, hours): 
+    """
+    Add a snapshot's row to a department's status rows, and the progress of the previous row (see calc_progress)
+    """
+    if rows: 
+        previous = rows[-1]
+        completed = rows[-2]["MOs Complete"] if len(rows) > 1 else 0
+        hours_completed = rows[-2]["Hours Complete"] if len(rows) > 1 else 0
+        previous["MOs Complete"] = completed + (previous["MO Count"] - count)
+        previous["Hours Complete"] = hours_completed + (previous["Hours"] - hours)
+        with np.errstate(divide = "ignore", invalid = "ignore"): 
+            previous["% MOs Complete"] = np.round(np.float64(previous["MOs Complete"]) / rows[0]["MO Count"] * 100, 2)
+            previous["% Hrs Complete"] = np.round(np.float64(previous["Hours Complete"]) / rows[0]["Hours"] * 100, 2)
+    rows.append({"Snapshot": timestamp, "MO Count": count, "Hours": hours})
+
+
+def status_tables(state): 
+    """
+    Each department's status, one row per snapshot
+
+    Returns
+    -------
+    status : dictionary
+        department as the key, df with the Snapshot, MO count, hours and progress columns as the value.
+    """
+    return {key: pd.DataFrame(rows) for key, rows in state["status"].items()}
+
+
+def compute_intraday(week = None, year = None, export_dir = ".", today = None, state = None): 
+    """
+    Add a week's snapshots in export_dir to its intra-day state
+
+    Parameters
+    ----------
+    week, year : int
+        ISO week and year, None uses the current ones.
+    export_dir : string
+        folder with the week's exports.
+    today : timestamp
+        passed to split_day.
+    state : dictionary, optional
+        state from an earlier call, only snapshots after its last one are added. A state of another week 
+        (e.g. the current week rolled over) is replaced by a new state of this week.
+
+    Returns
+    -------
+    state : dictionary
+        the week's state, see status_tables for its status.
+    """
+    year, week = current_week(week, None, year)[:2]
+    if state is None or (state["week"], state["year"]) != (week, year): 
+        state = new_intraday_state(week, year)
+    for timestamp, path in find_snapshots(export_dir, week, year): 
+        if not state["snapshots"] or timestamp > state["snapshots"][-1]: 
+            add_snapshot_at(state, timestamp, load_clean_export(path), today)
+    return state
+
+
+def write_intraday_reports(state, plot = True): 
+    """
+    Write the hourly status workbook and plot of a week's intra-day state
+    """
+    from .reports import write_workbook
+    status = status_tables(state)
+    write_workbook("Sch Conf Status Hourly WK" + str(state["week"]) + ".xlsx", status)
+    if plot: 
+        from .plots import generate_hourly_plot
+        with metrics.stage("plot", week = state["week"]): 
+            generate_hourly_plot(status, state["week"])
@@ -0,0 +1,246 @@
+"""
+Run metrics and profiling
+
+With settings.metrics on, every pipeline stage records its wall time and rows in and out, each filter the rows it
+kept, and each department its status and row counts. start_run clears the records, and finish_run writes them as
+a JSON run report and/or a Prometheus text file (for node_exporter's textfile collector). The process's max RSS is
+recorded after each stage, and the memory held by the main results (each cleaned export, the day dictionaries and
+the timelines) as "frame bytes"; set settings.metrics_memory to also trace each stage's peak memory with tracemalloc
+(slower, and the peak of stages running on parallel threads includes the other threads' allocations).
+
+Stages opened inside another stage on the same thread take on its labels (e.g. the file of the export being
+cleaned). Stages of workbooks written with report_pool = "process" run in the worker processes and aren't recorded.
+
+Functions decorated with profiled write a cProfile stats file per call to settings.profile_dir when it is set
+(only the outermost profiled call is profiled, e.g. compute_week covers everything it calls). Stages are plain
+named functions, so sampling profilers like py-spy also show them, e.g.
+py-spy record -o profile.svg -- python -m schedule_conformance run.
+
+When metrics and profiling are off each hook is one settings check.
+"""
+
+import cProfile
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+from . import settings
+
+try: 
+    import resource
+except ImportError:                         #not available on Windows
+    resource = None
+
+
+records = []                                #stage, filter and value records of the current run
+run_started = None
+nesting = threading.local()                 #stages open on each thread, for nested peak memory
+
+
+def start_run(): 
+    """
+    Clear the records and start recording a run (tracing memory if settings.metrics_memory is on)
+    """
+    global run_started
+    records.clear()
+    run_started = datetime.now()
+    if settings.metrics and settings.metrics_memory and not tracemalloc.is_tracing(): 
+        tracemalloc.start()
+
+
+def max_rss(): 
+    """
+    Highest resident memory of the process so far in bytes, None where it isn't available
+    """
+    if resource is None: 
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if os.uname().sysname == "Darwin" else rss * 1024       #bytes on macOS, KB on Linux
+
+
+@contextmanager
+def stage(name, rows_in = None, **labels): 
+    """
+    Record a pipeline stage, e.g.
+
+        with stage("clean", rows_in = len(df), file = path) as record: 
+            ...
+            record["rows_out"] = len(df)
+
+    Parameters
+    ----------
+    name : string
+        stage name.
+    rows_in : int
+        rows going into the stage.
+    labels
+        what the stage ran on, e.g. file, weekday or dept.
+    """
+    record = {"type": "stage", "stage": name, "labels": labels, "rows_in": rows_in, "rows_out": None}
+    if not settings.metrics: 
+        yield record
+        return
+    record["labels"] = stage_labels(labels)
+    open_stages = nesting.__dict__.setdefault("stages", [])
+    memory = tracemalloc.is_tracing()
+    if memory: 
+        current, peak = tracemalloc.get_traced_memory()
+        for parent in open_stages: 
+            parent["peak"] = max(parent["peak"], peak)
+        tracemalloc.reset_peak()
+        record["start"], record["peak"] = current, current
+    open_stages.append(record)
+    start = time.perf_counter()
+    try: 
+        yield record
+    finally: 
+        record["seconds"] = time.perf_counter() - start
+        open_stages.pop()
+        if memory: 
+            record["peak"] = max(record["peak"], tracemalloc.get_traced_memory()[1])
+            for parent in open_stages: 
+                parent["peak"] = max(parent["peak"], record["peak"])
+            record["peak_bytes"] = record.pop("peak") - record.pop("start")
+        record["max_rss_bytes"] = max_rss()
+        records.append(record)
+
+
+def stage_labels(labels): 
+    """
+    Labels of the innermost stage open on this thread, updated with labels
+    """
+    open_stages = getattr(nesting, "stages", None)
+    return {**open_stages[-1]["labels"], **labels} if open_stages else labels
+
+
+def count(name, rows_in, rows_out, **labels): 
+    """
+    Record how many rows a filter kept, with the labels of the stage it ran in
+    """
+    if settings.metrics: 
+        records.append({"type": "filter", "stage": name, "labels": stage_labels(labels), "rows_in": rows_in, "rows_out": rows_out})
+
+
+def value(name, number, **labels): 
+    """
+    Record a result, e.g. a department's MO count, with the labels of the stage it ran in
+    """
+    if settings.metrics: 
+        records.append({"type": "value", "name": name, "labels": stage_labels(labels), "value": number})
+
+
+def footprint(name, frames, **labels): 
+    """
+    Record the memory held by a stage's results in bytes (text and categories included), e.g. each day's scheduled MOs
+
+    Parameters
+    ----------
+    name : string
+        what the frames are, stored as the frames label.
+    frames : dataframe, or dictionary of dataframes
+        results of the stage.
+    """
+    if settings.metrics: 
+        frames = frames.values() if isinstance(frames, dict) else [frames]
+        value("frame bytes", sum(int(df.memory_usage(deep = True).sum()) for df in frames), frames = name, **labels)
+
+
+def run_report(): 
+    """
+    Records of the current run as a dictionary (the JSON run report)
+    """
+    return {"started": run_started.isoformat(timespec = "seconds") if run_started else None, 
+            "finished": datetime.now().isoformat(timespec = "seconds"), "settings": settings.current(), 
+            "stages": [record for record in records if record["type"] == "stage"], 
+            "filters": [record for record in records if record["type"] == "filter"], 
+            "values": [record for record in records if record["type"] == "value"]}
+
+
+def label_value(text): 
+    return str(text).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(prefix = "schedule_conformance"): 
+    """
+    Records of the current run in the Prometheus text format
+
+    Repeated stages with the same labels (e.g. every day's filters) are summed, so every series appears once.
+    """
+    series = {}
+    def add(metric, help_text, labels, number): 
+        if number is None: 
+            return
+        key = tuple(sorted((name, label_value(label)) for name, label in labels.items()))
+        metric_series = series.setdefault(metric, (help_text, {}))[1]
+        metric_series[key] = metric_series.get(key, 0) + number
+    for record in records: 
+        labels = dict(record["labels"], stage = record.get("stage", ""))
+        if record["type"] == "stage": 
+            add("stage_seconds", "wall time of the stage", labels, record["seconds"])
+            add("stage_peak_bytes", "peak traced memory of the stage", labels, record.get("peak_bytes"))
+            add("stage_rows_in", "rows going into the stage", labels, record["rows_in"])
+            add("stage_rows_out", "rows coming out of the stage", labels, record["rows_out"])
+        elif record["type"] == "filter": 
+            add("filter_rows_in", "rows going into the filter", labels, record["rows_in"])
+            add("filter_rows_out", "rows kept by the filter", labels, record["rows_out"])
+        else: 
+            add(record["name"].replace(" ", "_").lower(), record["name"], record["labels"], record["value"])
+    add("max_rss_bytes", "highest resident memory of the run", {}, max_rss())
+    if run_started is not None: 
+        add("last_run_timestamp_seconds", "time the run started", {}, run_started.timestamp())
+
+    lines = []
+    for metric, (help_text, values) in series.items(): 
+        lines += [f"# HELP {prefix}_{metric} {help_text}", f"# TYPE {prefix}_{metric} gauge"]
+        for key, number in values.items(): 
+            label_text = ",".join(f'{name}="{label}"' for name, label in key)
+            lines.append(f"{prefix}_{metric}{{{label_text}}} {number}" if label_text else f"{prefix}_{metric} {number}")
+    return "\n".join(lines) + "\n"
+
+
+def write_atomic(path, text): 
+    temp_file = path + ".tmp"
+    with open(temp_file, "w") as file: 
+        file.write(text)
+    os.replace(temp_file, path)                     #collectors never see a half written file
+
+
+def finish_run(report_path = None, prometheus_path = None): 
+    """
+    Write the run's records as a JSON run report and/or a Prometheus text file, and stop tracing memory
+    """
+    if report_path: 
+        write_atomic(report_path, json.dumps(run_report(), indent = 2, default = str))
+    if prometheus_path: 
+        write_atomic(prometheus_path, prometheus_text())
+    if tracemalloc.is_tracing(): 
+        tracemalloc.stop()
+
+
+profiling = threading.Lock()
+profile_numbers = itertools.count(1)
+
+def profiled(function): 
+    """
+    Decorator that profiles calls of a hot function with cProfile when settings.profile_dir is set
+    """
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs): 
+        if settings.profile_dir is None or not profiling.acquire(blocking = False):   #off, or inside another profiled call
+            return function(*args, **kwargs)
+        try: 
+            profiler = cProfile.Profile()
+            try: 
+                return profiler.runcall(function, *args, **kwargs)
+            finally: 
+                os.makedirs(settings.profile_dir, exist_ok = True)
+                profiler.dump_stats(os.path.join(settings.profile_dir, f"{function.__name__}-{os.getpid()}-{next(profile_numbers)}.prof"))
+        finally: 
+            profiling.release()
+    return wrapper
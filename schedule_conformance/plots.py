@@ -0,0 +1,381 @@
+"""
+Generating Graphs and Paretos
+
+each day a plot is generated to show the progress of MOs for each APU, as well as machine hours
+at the end of the week, the pareto of reasons for each department is generated (from the returned reasons workbooks, see reasons)
+
+Charts are drawn on matplotlib Figure objects with the non-interactive Agg canvas (pyplot and its GUI backends are
+never used), so they can be drawn on any thread or in worker processes. Each thread keeps its figures and clears and
+reuses them for the next chart of the same size. The daily status is drawn as a summary chart of every department
+plus a chart per department, any number of departments, each with its own color and marker. render_charts draws
+a list of charts one after another or on settings.plot_workers processes (e.g. every week of a backfill, see
+render_history_plots), saved in each of settings.plot_formats ("png", "svg" or "pdf"). A chart that fails doesn't
+stop the others, the failures are raised together as ChartErrors once every chart is drawn.
+
+matplotlib is only imported when a plot is drawn.
+
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from . import settings
+from .weeks import weekdays
+
+
+target = [20, 40, 60, 80, 100]
+markers = ["o", "x", "s", "d", "^", "v", "P"]
+rendering = threading.local()                   #figures of this thread, reused from one chart to the next
+
+
+class ChartErrors(Exception): 
+    """
+    Charts of render_charts that failed, failures has the chart's name as the key and its exception as the value
+    """
+    def __init__(self, failures): 
+        super().__init__(f"{len(failures)} charts could not be drawn: " + ", ".join(f"{name} ({error!r})" for name, error in failures.items()))
+        self.failures = failures
+
+
+def reused_figure(kind, figsize, rows = 1, sharex = False): 
+    """
+    Figure on an Agg canvas with a column of rows axes, the same Figure and axes every time for a kind of chart on a thread
+
+    Returns
+    -------
+    fig : Figure
+        of figsize, with its axes cleared (fig.axes, in order) and no title.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    figures = rendering.__dict__.setdefault("figures", {})
+    fig = figures.get(kind)
+    if fig is None: 
+        fig = Figure(figsize = figsize)
+        FigureCanvasAgg(fig)
+        fig.subplots(rows, 1, sharex = sharex, squeeze = False)
+        figures[kind] = fig
+    else: 
+        for axis in fig.axes: 
+            axis.cla()
+        fig.suptitle("")
+        fig.set_size_inches(figsize)
+    return fig
+
+
+def save_figure(fig, name, formats = None, tight = False): 
+    """
+    Save a figure as name.<format> for each format (default settings.plot_formats)
+
+    tight trims the figure to what's drawn, which draws it twice, the status charts are laid out beforehand instead 
+    (see status_layout).
+
+    Returns
+    -------
+    paths : list
+        files written.
+    """
+    paths = []
+    for fmt in formats or settings.plot_formats: 
+        paths.append(f"{name}.{fmt}")
+        fig.savefig(paths[-1], format = fmt, bbox_inches = "tight" if tight else None)
+    return paths
+
+
+def legend_columns(count): 
+    #15 entries fit next to an axis, with the target and forecast entries
+    return 1 + (count + 1) // 15
+
+
+def status_layout(fig, depts, height, title = False): 
+    """
+    Size a status chart for 6 inch wide plots with the legend to their right, from the length of the department 
+    names (the labels are "<dept>: <value>%") instead of measuring the drawn text
+    """
+    longest = max((len(str(dept)) for dept in depts), default = 0)
+    legend = max(legend_columns(len(depts)) * (.55 + .075 * (longest + 8)), 1.8)
+    width = .8 + 6 + .2 + legend
+    fig.set_size_inches(width, height)
+    fig.subplots_adjust(left = .8 / width, right = 6.8 / width, bottom = .5 / height, top = 1 - (.8 if title else .4) / height, 
+                        hspace = .9 / (height / 2))
+
+
+def dept_styles(depts): 
+    """
+    Color and marker of each department, in order: tab10 colors up to 10 departments, tab20 beyond, and markers
+    cycling at a different length so no two of the first 140 departments look the same
+
+    Returns
+    -------
+    styles : dictionary
+        department as the key and (color, marker) as the value.
+    """
+    from matplotlib import colormaps
+    depts = list(depts)
+    colors = colormaps["tab10" if len(depts) <= 10 else "tab20"].colors
+    return {dept: (colors[num % len(colors)], markers[num % len(markers)]) for num, dept in enumerate(depts)}
+
+
+def generate_2_plot(status, weekday_number, week, forecast = None, name = None, formats = None, styles = None): 
+    """
+    Creates plots with 2 subplots, one for % MOs completed and one for % Hrs completed, of every department
+
+    forecast (from forecast.forecast_week, optional) adds each department's projection to friday, as a dotted
+    line of the median with the low to high band shaded.
+
+    Returns
+    -------
+    paths : list
+        files written, name (default "Status Week <week>") in each format.
+    """
+    fig = reused_figure("status", (7,8), 2)
+    ax1, ax2 = fig.axes
+    status_layout(fig, status, 8)
+    styles = styles or dept_styles(status)
+    generate_subplots(status, "% MOs Complete", ax1, weekday_number, forecast, styles)
+    generate_subplots(status, "% Hrs Complete", ax2, weekday_number, forecast, styles)
+    return save_figure(fig, name or "Status Week " + str(week), formats)
+
+
+def generate_dept_plot(status, dept, weekday_number, week, forecast = None, name = None, formats = None, styles = None): 
+    """
+    Chart of one department's % MOs and % Hrs completed, like generate_2_plot
+
+    status only needs the department's status df, styles gives it the same color as on the summary chart.
+
+    Returns
+    -------
+    paths : list
+        files written, name (default "<dept> Status Week <week>") in each format.
+    """
+    fig = reused_figure("dept status", (7,7), 2)
+    ax1, ax2 = fig.axes
+    status_layout(fig, [dept], 7, title = True)
+    fig.suptitle(f"{dept} Week {week}")
+    dept_status = {dept: status[dept]}
+    styles = styles or dept_styles(dept_status)
+    if forecast is not None: 
+        forecast = forecast[forecast["Dept"] == dept]
+    generate_subplots(dept_status, "% MOs Complete", ax1, weekday_number, forecast, styles)
+    generate_subplots(dept_status, "% Hrs Complete", ax2, weekday_number, forecast, styles)
+    return save_figure(fig, name or f"{dept} Status Week {week}", formats)
+
+
+def status_plot_jobs(status, weekday_number, week, forecast = None, name = None, folder = None, formats = None): 
+    """
+    Charts of a week's status for render_charts: the summary chart and one chart per department
+
+    Parameters
+    ----------
+    name : string
+        file name of the summary chart, default "Status Week <week>", the department charts are "<dept> <name>".
+    folder : string
+        folder to save the charts to, default the working folder.
+    formats : list
+        formats to save, default settings.plot_formats (resolved here, worker processes don't inherit settings).
+    """
+    name = name or "Status Week " + str(week)
+    folder = folder or ""
+    formats = list(formats or settings.plot_formats)
+    styles = dept_styles(status)
+    jobs = [(name, generate_2_plot, (status, weekday_number, week, forecast, os.path.join(folder, name), formats, styles))]
+    for dept in status: 
+        dept_forecast = None if forecast is None else forecast[forecast["Dept"] == dept]
+        jobs.append((f"{dept} {name}", generate_dept_plot, ({dept: status[dept]}, dept, weekday_number, week, dept_forecast, 
+                                                            os.path.join(folder, f"{dept} {name}"), formats, styles)))
+    return jobs
+
+
+def render_charts(jobs, max_workers = None): 
+    """
+    Draw charts one after another, or on a pool of processes
+
+    Parameters
+    ----------
+    jobs : list
+        (name, function, args) of each chart, e.g. from status_plot_jobs.
+    max_workers : int
+        number of processes, None uses settings.plot_workers (None there is one per core). 1 draws every chart on
+        this thread.
+
+    Returns
+    -------
+    paths : list
+        files written. Charts that fail raise ChartErrors with each one's exception once every chart is drawn.
+    """
+    if max_workers is None: 
+        max_workers = settings.plot_workers
+    paths, failures = [], {}
+    def run(name, function, *args): 
+        try: 
+            paths.extend(function(*args))
+        except Exception as error: 
+            failures[name] = error
+    if max_workers == 1 or len(jobs) <= 1: 
+        for name, function, args in jobs: 
+            run(name, function, *args)
+    else: 
+        #spawned workers, forking is unsafe while other threads run (e.g. the workbooks of write_reports)
+        with ProcessPoolExecutor(max_workers = max_workers, mp_context = multiprocessing.get_context("spawn")) as executor: 
+            futures = {name: executor.submit(function, *args) for name, function, args in jobs}
+        for name, future in futures.items(): 
+            run(name, future.result)
+    if failures: 
+        raise ChartErrors(failures)
+    return paths
+
+
+def render_status_plots(status, weekday_number, week, forecast = None, max_workers = None): 
+    """
+    Draw the summary status chart and each department's chart of the week (see status_plot_jobs)
+    """
+    return render_charts(status_plot_jobs(status, weekday_number, week, forecast), max_workers)
+
+
+def render_history_plots(history, folder = ".", max_workers = None, formats = None): 
+    """
+    Draw the status charts of every week in a status history dataset (see backfill)
+
+    Parameters
+    ----------
+    history : dataframe
+        rows of the history dataset, with Year, Week and Dept columns.
+    folder : string
+        folder to save the charts to, named "Status <year> Week <week>" and "<dept> Status <year> Week <week>".
+    max_workers : int
+        number of processes, None uses settings.plot_workers.
+
+    Returns
+    -------
+    paths : list
+        files written.
+    """
+    os.makedirs(folder, exist_ok = True)
+    jobs = []
+    for (year, week), rows in history.groupby(["Year", "Week"], sort = True): 
+        #a week exported to more than one folder is charted from the last one backfilled
+        status = {dept: df.drop_duplicates("Weekday", keep = "last").drop(columns = ["Year", "Week", "Dept"]).reset_index(drop = True)
+                  for dept, df in rows.groupby("Dept", sort = False)}
+        weekday_number = max(len(df) for df in status.values()) - 1
+        jobs += status_plot_jobs(status, weekday_number, week, name = f"Status {year} Week {week}", folder = folder, 
+                                 formats = formats)
+    return render_charts(jobs, max_workers)
+
+
+def generate_hourly_plot(status, week): 
+    """
+    Plot each department's % MOs and % hours complete at every snapshot of the week (see intraday)
+
+    Parameters
+    ----------
+    status : dictionary
+        each department's intra-day status df, with a Snapshot column.
+    week : int
+        week number, for the file name.
+    """
+    import matplotlib.dates as mdates
+    fig = reused_figure("hourly", (10,8), 2, sharex = True)
+    axes = fig.axes
+    styles = dept_styles(status)
+    for axis, variable, title in zip(axes, ["% MOs Complete", "% Hrs Complete"], ["MO Status", "Labor Status"]): 
+        for key, value in status.items(): 
+            if variable in value: 
+                axis.plot(value["Snapshot"], value[variable], alpha = .7, color = styles[key][0], marker = ".", label = key)
+        axis.set_title(title)
+        axis.set_ylabel("% Complete")
+        axis.set_ylim(0, 100)
+        axis.grid(True)
+        if axis.lines: 
+            axis.legend(loc = "upper left", bbox_to_anchor = (1.01, 1), fontsize = "small", ncol = legend_columns(len(status)))
+    axes[1].xaxis.set_major_formatter(mdates.DateFormatter("%a %H:%M"))
+    fig.autofmt_xdate()
+    return save_figure(fig, "Status Week " + str(week) + " Hourly", tight = True)
+
+
+def generate_pareto_plot(pareto, title, name, formats = None): 
+    """
+    Pareto chart of reasons: MOs of each reason as bars, most frequent first, and the cumulative % as a line
+
+    Parameters
+    ----------
+    pareto : dataframe
+        one pareto table from reasons.reason_pareto.
+    title : string
+        title of the chart.
+    name : string
+        file name to save the chart to, without the extension.
+    """
+    fig = reused_figure("pareto", (10,6))
+    fig.clear()                                 #clearing a twin axis moves it back to the left, so both are new
+    axis = fig.subplots()
+    cumulative = axis.twinx()
+    x = list(range(len(pareto)))
+    axis.bar(x, pareto["MOs"], color = "steelblue")
+    axis.set_ylabel("MOs not completed")
+    axis.set_xticks(x, pareto["Reason"], rotation = 60, ha = "right", fontsize = 8)
+    axis.set_title(title)
+    cumulative.plot(x, pareto["Cumulative %"], color = "red", marker = "o")
+    cumulative.axhline(80, color = "grey", linestyle = "--", alpha = .7)
+    cumulative.set_ylim(0, 105)
+    cumulative.set_ylabel("Cumulative %")
+    return save_figure(fig, name, formats, tight = True)
+
+
+def generate_subplots(status, variable, axis, weekday_number, forecast = None, styles = None): 
+    """
+    plots subplots on given axis
+
+    Parameters
+    ----------
+    status : dictionary
+        each department's status df.
+    variable : string
+        variable to plot, either '% MOs Complete' or '% Hrs Complete' .
+    axis: axis to plot variable on
+    weekday_number : int
+        number of the last weekday in the status.
+    forecast : dataframe, optional
+        end of week forecast, drawn from the last day with progress to friday.
+    styles : dictionary, optional
+        (color, marker) of each department, default dept_styles of the status.
+
+    Each department's latest % complete is shown in the legend, next to the axis.
+    """
+    styles = styles or dept_styles(status)
+    if variable == "% MOs Complete": 
+        string1 = "MO Status"
+        string2 = "MOs"
+    else: 
+        string1 = "Labor Status"
+        string2 = "Hours"
+
+    if weekday_number >0: 
+        x = list(range(weekday_number+1))
+        for key, value in status.items(): 
+            color, marker = styles[key]
+            axis.plot(x, value[variable], alpha = .7, color = color, marker = marker, 
+                      label = f"{key}: {value.at[weekday_number-1, variable]}%")
+        axis.plot(x[:weekday_number], target[:weekday_number], alpha =.7, color = 'navy', linestyle = '--', label = "Target")
+        if forecast is not None and len(forecast): 
+            #projection of each department from its last progress, the dotted lines are one legend entry
+            days = list(range(weekday_number-1, 5))
+            axis.plot(days, target[weekday_number-1:], alpha =.7, color = 'navy', linestyle = '--')
+            for key, value in status.items(): 
+                projected = forecast[forecast["Dept"] == key]
+                if projected.empty: 
+                    continue
+                last = value.at[weekday_number-1, variable]
+                median, low, high = ([last] + list(projected[variable.replace("Complete", band)]) for band in ["Complete", "Low", "High"])
+                axis.plot(days, median, alpha = .7, color = styles[key][0], linestyle = ":")
+                axis.fill_between(days, low, high, alpha = .15, color = styles[key][0])
+            axis.plot([], [], color = "grey", linestyle = ":", label = "Forecast")
+            x = list(range(max(weekday_number, 4)+1))
+        axis.legend(title = f"% of {string2} Complete", loc = "upper left", bbox_to_anchor = (1.01, 1), fontsize = "small", 
+                    ncol = legend_columns(len(status)))
+        axis.set_title(string1)
+        axis.set_xticks(x, weekdays[:len(x)])
+        axis.set_ylabel("% Complete")
+        axis.grid(True)
+        axis.set_ylim(0, 100)
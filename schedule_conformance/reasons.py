@@ -0,0 +1,241 @@
+"""
+Reasons round trip
+
+generate_reasons sends each department '<Dept> Sch Conf Reasons WK<n> <year>.xlsx' at the end of the week, with a
+Status and a Reason dropdown for every MO that wasn't completed. ingest_reasons reads the workbooks that come
+back (searched recursively, so years of weekly folders can be pointed at) into a SQLite store with one row per
+MO and reason, and reason_pareto ranks the reasons by department and week range. The year of a workbook comes 
+from its name, workbooks named without one (from before the year was added) need the year passed.
+
+Workbooks are read in openpyxl's read only (streaming) mode, in parallel processes, and the store remembers the
+size and modified time of every workbook it read, so later runs only read new or re-saved workbooks.
+"""
+
+import os
+import re
+import sqlite3
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from . import metrics, settings
+
+
+reasons_pattern = re.compile(r"^(.+) Sch Conf Reasons WK(\d+)(?: (\d{4}))?\.xlsx$", re.IGNORECASE)
+reason_columns = ["Year", "Week", "Dept", "Order", "Item", "Mach hrs rem", "Status", "Reason", "Comment", "File"]
+
+
+def find_reasons_workbooks(folder): 
+    """
+    Reasons workbooks in a folder and its subfolders
+
+    Returns
+    -------
+    workbooks : list
+        (path, department, week, year) of each workbook, year None if the name has none.
+    """
+    workbooks = []
+    for parent, subfolders, files in os.walk(folder): 
+        for file in files: 
+            match = reasons_pattern.match(file)
+            if match: 
+                year = int(match.group(3)) if match.group(3) else None
+                workbooks.append((os.path.join(parent, file), match.group(1), int(match.group(2)), year))
+    return sorted(workbooks, key = lambda workbook: workbook[:3])
+
+
+def read_reasons_workbook(path, dept, week, year): 
+    """
+    Rows of a filled in reasons workbook
+
+    Parameters
+    ----------
+    path : string
+        path of the workbook.
+    dept, week, year
+        department, week and ISO year of the workbook.
+
+    Returns
+    -------
+    reasons : dataframe
+        one row per MO and reason with reason_columns, MOs without a reason have an empty Reason.
+    """
+    from openpyxl import load_workbook
+    workbook = load_workbook(path, read_only = True, data_only = True)
+    try: 
+        rows = workbook.worksheets[0].iter_rows(values_only = True)
+        header = [str(col).strip() if col is not None else "" for col in next(rows, [])]
+        df = pd.DataFrame([row for row in rows if any(value is not None for value in row)], columns = header or None)
+    finally: 
+        workbook.close()
+    df = df.reindex(columns = ["Order", "Item", "Mach hrs rem", "Status", "Reason", "Comment"])
+    df = df[df["Order"].notna()]
+    for col in ["Order", "Item", "Status", "Reason", "Comment"]: 
+        df[col] = df[col].astype("string").str.strip().replace("", pd.NA)
+    df["Mach hrs rem"] = pd.to_numeric(df["Mach hrs rem"], errors = "coerce")
+    df = df.assign(Year = year, Week = week, Dept = dept, File = os.path.abspath(path))
+    return df[reason_columns]
+
+
+def open_store(store_path): 
+    """
+    Open (and create) the reasons store
+    """
+    connection = sqlite3.connect(store_path)
+    connection.execute('CREATE TABLE IF NOT EXISTS reason_files (File TEXT PRIMARY KEY, Size INTEGER, Modified INTEGER)')
+    connection.execute('CREATE TABLE IF NOT EXISTS reasons (Year INTEGER, Week INTEGER, Dept TEXT, "Order" TEXT, Item TEXT, '
+                       '"Mach hrs rem" REAL, Status TEXT, Reason TEXT, Comment TEXT, File TEXT)')
+    connection.execute('CREATE INDEX IF NOT EXISTS reasons_week ON reasons (Year, Week, Dept)')
+    connection.execute('CREATE INDEX IF NOT EXISTS reasons_file ON reasons (File)')
+    return connection
+
+
+def ingest_reasons(folder, store_path = "Sch Conf Reasons.sqlite", max_workers = None, year = None): 
+    """
+    Read new and re-saved reasons workbooks in folder into the store
+
+    A workbook replaces the earlier rows of its department and week (and of the same file). Workbooks that 
+    can't be read, or have no year, are skipped with a warning (and read again next time).
+
+    Parameters
+    ----------
+    folder : string
+        folder (searched recursively) with the returned reasons workbooks.
+    store_path : string
+        SQLite file of the store.
+    max_workers : int
+        number of processes reading workbooks, None uses one per core, 1 reads them on this process.
+    year : int, optional
+        ISO year of the workbooks named without a year ('<Dept> Sch Conf Reasons WK<n>.xlsx').
+
+    Returns
+    -------
+    read : int
+        number of workbooks read.
+    """
+    connection = open_store(store_path)
+    try: 
+        known = {file: (size, modified) for file, size, modified in connection.execute("SELECT File, Size, Modified FROM reason_files")}
+        jobs = {}
+        for path, dept, week, named_year in find_reasons_workbooks(folder): 
+            stat = os.stat(path)
+            if known.get(os.path.abspath(path)) != (stat.st_size, stat.st_mtime_ns): 
+                if named_year is None and year is None: 
+                    warnings.warn(f"{path} skipped, its name has no year (pass the year of the workbooks named without one)")
+                    continue
+                jobs[(path, dept, week, named_year or year)] = (stat.st_size, stat.st_mtime_ns)
+
+        with metrics.stage("read reasons", rows_in = len(jobs)) as record: 
+            results = {}
+            def run(job, function, *args): 
+                try: 
+                    results[job] = function(*args)
+                except Exception as error: 
+                    warnings.warn(f"{job[0]} could not be read - {error!r}")
+            if max_workers == 1 or len(jobs) <= 1: 
+                for job in jobs: 
+                    run(job, read_reasons_workbook, *job)
+            else: 
+                with ProcessPoolExecutor(max_workers = max_workers) as executor: 
+                    futures = {job: executor.submit(read_reasons_workbook, *job) for job in jobs}
+                    for job, future in futures.items(): 
+                        run(job, future.result)
+            record["rows_out"] = sum(len(df) for df in results.values())
+
+        with connection:                                                    #one transaction, all or nothing
+            for (path, dept, week, year), df in results.items(): 
+                file = os.path.abspath(path)
+                #a week's department has one set of rows, e.g. a copy of the workbook in another folder replaces them
+                connection.execute("DELETE FROM reasons WHERE (Year = ? AND Week = ? AND Dept = ?) OR File = ?", 
+                                   (year, week, dept, file))
+                rows = df.astype(object).where(df.notna(), None).itertuples(index = False, name = None)
+                connection.executemany(f"INSERT INTO reasons VALUES ({', '.join('?' * len(reason_columns))})", rows)
+                connection.execute("INSERT OR REPLACE INTO reason_files VALUES (?, ?, ?)", (file, *jobs[(path, dept, week, year)]))
+        return len(results)
+    finally: 
+        connection.close()
+
+
+def load_reasons(store_path = "Sch Conf Reasons.sqlite", start = None, end = None, depts = None): 
+    """
+    Rows of the store, optionally limited to a range of weeks and some departments
+
+    Parameters
+    ----------
+    start, end : tuple
+        (year, week) of the first and last week, None for no limit.
+    depts : list
+        departments to keep, None keeps all.
+    """
+    conditions, parameters = [], []
+    if start is not None: 
+        conditions.append("Year * 100 + Week >= ?")
+        parameters.append(start[0] * 100 + start[1])
+    if end is not None: 
+        conditions.append("Year * 100 + Week <= ?")
+        parameters.append(end[0] * 100 + end[1])
+    if depts: 
+        conditions.append(f"Dept IN ({', '.join('?' * len(depts))})")
+        parameters += list(depts)
+    query = "SELECT * FROM reasons" + (" WHERE " + " AND ".join(conditions) if conditions else "")
+    connection = open_store(store_path)
+    try: 
+        return pd.read_sql_query(query, connection, params = parameters)
+    finally: 
+        connection.close()
+
+
+def reason_pareto(reasons, by = None): 
+    """
+    Pareto table of the reasons MOs weren't completed
+
+    Parameters
+    ----------
+    reasons : dataframe
+        rows from load_reasons.
+    by : list
+        columns to make a separate pareto for, e.g. ["Dept"], None for one pareto of every row.
+
+    Returns
+    -------
+    pareto : dataframe
+        MOs and machine hours for each reason, most frequent reason first, with the % of MOs and the cumulative %.
+        MOs without a reason are left out.
+    """
+    by = list(by or [])
+    given = reasons[reasons["Reason"].notna()]
+    pareto = given.groupby(by + ["Reason"]).agg(MOs = ("Order", "size"), **{"Mach hrs": ("Mach hrs rem", "sum")}).reset_index()
+    pareto = pareto.sort_values(by + ["MOs", "Mach hrs"], ascending = [True] * len(by) + [False, False], kind = "stable")
+    totals = pareto.groupby(by)["MOs"].transform("sum") if by else pareto["MOs"].sum()
+    cumulative = pareto.groupby(by)["MOs"].cumsum() if by else pareto["MOs"].cumsum()
+    pareto["% of MOs"] = round(pareto["MOs"] / totals * 100, 2)
+    pareto["Cumulative %"] = round(cumulative / totals * 100, 2)
+    return pareto.reset_index(drop = True)
+
+
+def write_pareto_reports(reasons, label, plot = True): 
+    """
+    Write the pareto of every department and of all departments to 'Reasons Pareto <label>.xlsx', one sheet each, 
+    and a chart of each to 'Reasons Pareto <label> <Dept>.png'
+
+    Parameters
+    ----------
+    reasons : dataframe
+        rows from load_reasons.
+    label : string
+        week range in the file names, e.g. 'WK20 2025 to WK30 2025', 'from WK20 2025' or 'all weeks' (see cli).
+    """
+    from .reports import write_workbook
+    tables = {"All": reason_pareto(reasons)}
+    by_dept = reason_pareto(reasons, ["Dept"])
+    for dept, table in by_dept.groupby("Dept", sort = True): 
+        tables[dept] = table.drop(columns = "Dept").reset_index(drop = True)
+    write_workbook(f"Reasons Pareto {label}.xlsx", tables)
+    if plot: 
+        from .plots import generate_pareto_plot, render_charts
+        formats = list(settings.plot_formats)
+        render_charts([(f"Reasons Pareto {label} {name}", generate_pareto_plot, 
+                        (table, f"{name} reasons {label}", f"Reasons Pareto {label} {name}", formats)) 
+                       for name, table in tables.items() if len(table)])
+    return tables
@@ -0,0 +1,332 @@
+"""
+Exporting dataframes to excel
+
+Not Scheduled MOs file: workbook with a sheet for each department of not scheduled MOs and progress 
+Sch Conf Status file: workbook with a sheet for each department of scheduled MOs and progress, and mid-week a 
+    Forecast sheet with each department's end of week forecast (see forecast)
+APU Sch Conf Reasons file: a file for each APU, exported at end of week, with not completed scheduled MOs
+    for apu managers to fill with reasons not complete
+
+Each workbook is written once, in openpyxl's streaming (write only) mode: column widths are worked out from 
+the dataframes before the rows are written, and the header formatting and dropdowns are added in the same pass, 
+so writing takes time and memory proportional to the data instead of writing, reloading and saving again.
+openpyxl is only imported when a workbook is written.
+
+write_reports writes the workbooks of a run in parallel, one task per department and workbook, with the 
+number of workers and the pool type in settings (report_workers, report_pool). A workbook that fails is 
+reported and the others are still written. Given the fingerprints of the workbooks it already wrote, it 
+only rewrites the ones whose contents changed (see watch).
+"""
+
+import hashlib
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import zip_longest
+
+import numpy as np
+import pandas as pd
+
+from . import settings
+from . import metrics
+from .departments import dept_facilities
+from .forecast import forecast_week, load_burn_rates
+from .ingest import widen_float32
+from .status import scheduled_mos_on
+from .weeks import export_path, weekdays
+
+
+def column_widths(df): 
+    """
+    Width of each column that fits its header and longest value as text, worked out from the df 
+    (one vectorized string length per column) instead of from the written cells
+
+    Returns
+    -------
+    widths : list
+        width of each column, in column order.
+    """
+    widths = []
+    for col in df.columns: 
+        values = df[col].dropna()
+        if pd.api.types.is_float_dtype(values): 
+            #openpyxl writes floats with 16 significant digits, measure the number that is read back from that
+            values = pd.Series(np.char.mod("%.16g", values.to_numpy()).astype(float))
+        elif pd.api.types.is_datetime64_any_dtype(values): 
+            values = values.dt.strftime("%Y-%m-%d %H:%M:%S")    #written as datetimes, shown with the time
+        longest = values.astype(str).str.len().max() if len(values) else 0
+        widths.append(max(len(str(col)), longest) + 2)
+    return widths
+
+
+def workbook_fingerprint(sheets, validations = None): 
+    """
+    Hash of a workbook's contents (sheet names, columns, values and dropdowns), the same for the same workbook
+    """
+    fingerprint = hashlib.blake2b(repr(validations).encode(), digest_size = 16)
+    for sheet_name, df in sheets.items(): 
+        fingerprint.update(repr((sheet_name, list(df.columns), len(df))).encode())
+        fingerprint.update(pd.util.hash_pandas_object(df, index = False).to_numpy().tobytes())
+    return fingerprint.hexdigest()
+
+
+@metrics.profiled
+def write_workbook(name, sheets, validations = None): 
+    """
+    Write dataframes to a new workbook in one streaming pass
+
+    Parameters
+    ----------
+    name : string
+        file name of the workbook.
+    sheets : dictionary
+        sheet name as the key and the df to write (without its index) as the value, in sheet order.
+    validations : dictionary, optional
+        sheet name as the key and a list of (list formula, cell range) dropdowns for that sheet as the value, 
+        e.g. {"Sheet1": [("Sheet2!$A$2:$A$25", "E2:E21")]}.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet.datavalidation import DataValidation
+
+    with metrics.stage("workbook", rows_in = sum(len(df) for df in sheets.values()), file = name): 
+        workbook = Workbook(write_only = True)
+        thin = Side(style = "thin")
+        header_font, header_border = Font(bold = True), Border(left = thin, right = thin, top = thin, bottom = thin)
+        header_alignment = Alignment(horizontal = "center", vertical = "top")    #same header formatting as pandas to_excel
+        for sheet_name, df in sheets.items(): 
+            sheet = workbook.create_sheet(sheet_name)
+            df = widen_float32(df)
+            #column widths and dropdowns have to be set before any rows are streamed
+            for number, width in enumerate(column_widths(df), start = 1): 
+                sheet.column_dimensions[get_column_letter(number)].width = width
+            for formula, cells in (validations or {}).get(sheet_name, []): 
+                dv = DataValidation(type = "list", formula1 = formula, allow_blank = True)
+                dv.add(cells)
+                sheet.data_validations.append(dv)
+            header = []
+            for col in df.columns: 
+                cell = WriteOnlyCell(sheet, value = col)
+                cell.font, cell.border, cell.alignment = header_font, header_border, header_alignment
+                header.append(cell)
+            sheet.append(header)
+            values = df.astype(object).where(df.notna(), None)     #missing values are left as empty cells
+            for row in values.itertuples(index = False, name = None): 
+                sheet.append(row)
+        workbook.save(name)
+
+
+def monday_mos_workbooks(timeline, week): 
+    """
+    Workbook of each department's scheduled MOs from monday's list
+
+    Returns
+    -------
+    workbooks : list
+        (file name, sheets, validations) of each department's workbook, the arguments of write_workbook.
+    """
+    monday_mos = scheduled_mos_on(timeline, "Monday")
+    workbooks = []
+    for key in dept_facilities: 
+        df_to_export = monday_mos[key][["Order", "Item", "Description", "Mach hrs rem"]]
+        workbooks.append((key + " Monday Scheduled MOs WK" +str(week)+".xlsx", {"Sheet1": df_to_export}, None))
+    return workbooks
+
+
+def write_monday_mos(timeline, week): 
+    """
+    Write each department's scheduled MOs from monday's list to its own workbook
+    """
+    for workbook in monday_mos_workbooks(timeline, week): 
+        write_workbook(*workbook)
+
+
+def reasons_workbooks(scheduled_timeline, status, week, year): 
+    """
+    Reasons workbook of each department (see generate_reasons)
+
+    Returns
+    -------
+    workbooks : list
+        (file name, sheets, validations) of each department's workbook, the arguments of write_workbook.
+    """
+    #define reasons and status
+    reasons_list = ["Safety Stop/hold", "Quality hold - NCR", "metals/materials not in stock", "metals/materials not prepped", 
+                "material at OSP", "in-stock material found defective", "no compound - outside supplier", "no compound - in-house (M&P)", 
+                "mold/tool not available - needs repair", "mold/tool not available - needs cleaning", "insufficient qty of material", 
+                "prior work order not complete", "equipment not operational", "equipment under maintenance/PM", 
+                "equipment/process not released by Tech/Mfg Eng", "Engineering hold (Design/Product)", "failed bat heat/test", 
+                "replaced by expedited work order", "1st pcs failed", "no operator", "documentation error", "waiting on Test Lab", 
+                "insufficient time/over scheduled", "hold over from prior week"]
+    
+    status_list = ["not started", "in progress", "completed"]
+    df_reasons = pd.DataFrame(list(zip_longest(reasons_list, status_list)),  columns = ["Reasons", "Status"])
+    
+    #write dataframe and reasons/status df to excel workbook sheets
+    friday_mos = scheduled_mos_on(scheduled_timeline, "Friday")
+    list_range = "Sheet2!$A$2:$A$25" #location of reasons list
+    list_range2 = "Sheet2!$B$2:$B$4" #location of status list
+    #reasons dropdown in column E, status dropdown in column D, for rows 2 to 21
+    dropdowns = {"Sheet1": [(list_range, "E2:E21"), (list_range2, "D2:D21")]}
+    workbooks = []
+    for key, value in status.items(): 
+        workbook_name = f"{key} Sch Conf Reasons WK{week} {year}.xlsx"        #the year is read back with the reasons
+        df_to_export = friday_mos[key]
+        df_to_export = df_to_export[["Order", "Item", "Mach hrs rem"]]
+        df_to_export.insert(3, "Status", "")
+        df_to_export.insert(4, "Reason", "")
+        df_to_export.insert(5, "Comment", "")
+        workbooks.append((workbook_name, {"Sheet1": df_to_export, "Sheet2": df_reasons}, dropdowns))
+    return workbooks
+
+
+def generate_reasons(scheduled_timeline, status, week, year): 
+    """
+    Loops through each department
+    Writes a df with unfinished MOs in that dept to sheet1 in a new spreadsheet
+    Add data validation to the next two columns of the spreadsheet
+
+    
+    Add the list of reasons and status in Columns A and B on sheet 2 of excel file
+    Then adds a status list data validation in row D, reasons list in row E
+
+    columns on both sheets are fitted to the length of text contained in the columns
+    the ISO year of the week is in the file name, e.g. 'DeptB Sch Conf Reasons WK23 2025.xlsx'
+
+    """
+    for workbook in reasons_workbooks(scheduled_timeline, status, week, year): 
+        write_workbook(*workbook)
+
+
+def write_to_excel(dictionary, name):
+    """
+    Parameters
+    ----------
+    dictionary : dictionary (format key (string): value(df))
+        dictionary with a key and correspinding df for each department.
+    name : string
+        name of file you want to save
+
+    writes all dfs in a dictionary to an excel file
+    name sheets by the keys
+    fit column width to width of text
+
+    """
+    write_workbook(name, dictionary)
+
+
+def write_rejects(week, rejects): 
+    """
+    Save the date values of the week's exports that couldn't be parsed, with the file and line they came from
+
+    rejects is filled by compute_week (export file name: rejected values), the file of an earlier run is removed 
+    when the exports have none.
+    """
+    name = "Rejected Values WK" + str(week) + ".csv"
+    if rejects: 
+        day_number = lambda file: next((number for number, day in enumerate(weekdays) if file.startswith(day)), len(weekdays))
+        files = sorted(rejects, key = day_number)                               #in weekday order, files load in any order
+        pd.concat({file: rejects[file] for file in files}, names = ["File", None]).droplevel(1).to_csv(name)
+    elif os.path.exists(name): 
+        os.remove(name)
+
+
+def write_reports(week, weekday_number, scheduled_timeline, status, not_scheduled_dict, plot = False, max_workers = None, 
+                  written = None, rejects = None, year = None, export_dir = "."): 
+    """
+    Write every workbook of the daily run (results of compute_week), the reasons workbooks only at the end of the week
+
+    Each department's workbooks and the not scheduled and status workbooks are separate tasks on a pool of 
+    settings.report_pool ("thread" or "process") workers. The files are the same as writing them one after another.
+
+    Parameters
+    ----------
+    week, weekday_number : int
+        week number and number of the last weekday in the results.
+    scheduled_timeline, status, not_scheduled_dict
+        results of compute_week.
+    plot : bool
+        also draw the status plots (summary and per department), on this thread or settings.plot_workers processes 
+        while the workbooks are written.
+    max_workers : int
+        number of workers, None uses settings.report_workers. 1 writes everything on this thread.
+    written : dictionary, optional
+        file name as the key and workbook_fingerprint as the value of the workbooks already written. Workbooks 
+        with the same contents (and the plot, if the status didn't change) are skipped, and it's updated with 
+        the workbooks written.
+    rejects : dictionary, optional
+        rejected date values of the week's exports (see compute_week), written to "Rejected Values WK<week>.csv". 
+        None leaves the file as it is.
+    year : int, optional
+        ISO year of the week, in the names of the reasons workbooks. None takes it from the dates in the week's 
+        monday export in export_dir (see backfill.export_year), not from today's date, e.g. week 52 run in january.
+    export_dir : string
+        folder with the week's exports.
+
+    Returns
+    -------
+    failures : dictionary
+        file name as the key and the exception as the value, for each report that couldn't be written. 
+        Failures are also reported with warnings, and don't stop the other reports.
+    """
+    workbooks = monday_mos_workbooks(scheduled_timeline, week)
+    #save not scheduled mos to file with sheet for each department
+    workbooks.append(("Not Scheduled MOs WK" +str(week) + ".xlsx", not_scheduled_dict, None))
+    #write status dfs to workbook, mid-week with the end of week forecast
+    forecast = forecast_week(scheduled_timeline, weekday_number, load_burn_rates())
+    sheets = dict(status, Forecast = forecast) if len(forecast) else status
+    workbooks.append(("Sch Conf Status WK" + str(week) +".xlsx", sheets, None))
+    #on saturday, create final statuses and reasons spreadsheet
+    if weekday_number >= 5:  
+       if year is None: 
+           from .backfill import export_year
+           year = export_year(export_path("Monday", week, export_dir), week)
+       workbooks += reasons_workbooks(scheduled_timeline, status, week, year)
+    if written is not None: 
+        fingerprints = {workbook[0]: workbook_fingerprint(*workbook[1:]) for workbook in workbooks}
+        workbooks = [workbook for workbook in workbooks if written.get(workbook[0]) != fingerprints[workbook[0]]]
+        plot = plot and any(workbook[0].startswith("Sch Conf Status") for workbook in workbooks)   #plot of the same status
+
+    if max_workers is None: 
+        max_workers = settings.report_workers
+    failures = {}
+    def run(name, function, *args): 
+        try: 
+            function(*args)
+        except Exception as error: 
+            failures[name] = error
+    def plot_charts(): 
+        from .plots import ChartErrors
+        try: 
+            draw_plot(status, weekday_number, week, forecast)
+        except ChartErrors as error:                                        #each chart that failed by its own name
+            failures.update(error.failures)
+    if rejects is not None: 
+        run("Rejected Values WK" + str(week) + ".csv", write_rejects, week, rejects)
+    if max_workers == 1: 
+        for workbook in workbooks: 
+            run(workbook[0], write_workbook, *workbook)
+        if plot: 
+            run("Status Week " + str(week), plot_charts)
+    else: 
+        pool = ProcessPoolExecutor if settings.report_pool == "process" else ThreadPoolExecutor
+        with pool(max_workers = max_workers) as executor: 
+            futures = {workbook[0]: executor.submit(write_workbook, *workbook) for workbook in workbooks}
+            if plot: 
+                run("Status Week " + str(week), plot_charts)
+            for name, future in futures.items(): 
+                run(name, future.result)
+    for name, error in failures.items(): 
+        warnings.warn(f"{name} could not be written - {error!r}")
+    if written is not None: 
+        written.update({workbook[0]: fingerprints[workbook[0]] for workbook in workbooks if workbook[0] not in failures})
+    return failures
+
+
+def draw_plot(status, weekday_number, week, forecast = None): 
+    #plots are only imported when one is drawn
+    from .plots import render_status_plots
+    with metrics.stage("plot", week = week): 
+        render_status_plots(status, weekday_number, week, forecast)
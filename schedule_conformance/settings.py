@@ -0,0 +1,70 @@
+"""
+Settings used by every stage of the calculations
+
+Change them with configure (the command line options and the script's settings do this), e.g. 
+configure(cache_dir = None, calc_engine = "compare").
+"""
+
+#folder where cleaned exports are cached between runs, set to None to always re-parse every CSV
+cache_dir = ".sched_conf_cache"
+
+#"vectorized" (default), "rowwise" (original row by row calculations) or "compare" (run both and warn on any difference)
+calc_engine = "vectorized"
+
+#rows per chunk when streaming large plant-wide exports, None reads each export in one go
+ingest_chunksize = None
+
+#CSV parser, "c" (default) or "pyarrow" (faster multi-threaded parsing, not used when streaming in chunks)
+csv_engine = "c"
+
+#threads loading (reading and cleaning) the week's exports at the same time, None uses one per export, 1 loads them 
+#one after another
+load_workers = None
+
+#workers writing the report workbooks, None uses the pool's default (one or more per core), 1 writes them one after another
+report_workers = None
+report_pool = "thread"      #"thread" or "process" (worth it for very large workbooks)
+
+#record each stage's time, rows in and out and memory for the run report (see metrics), 
+#metrics_memory also traces each stage's peak memory with tracemalloc (slower)
+metrics = False
+metrics_memory = False
+
+#folder for cProfile stats of the hot functions, None turns profiling off
+profile_dir = None
+
+#keep a week of exports compact for plant-wide weeks: text shared between days, hours and quantities as float32 and only 
+#the columns the calculations use (see ingest.compact_export), the timelines and results are the same float64 values
+low_memory = False
+
+#Monte Carlo trials of the end of week forecast on mid-week runs (see forecast), 0 turns the forecast off, and the 
+#history of each facility's daily burn rates it draws from with the week's own (written by backfill, .csv or .parquet)
+forecast_trials = 5000
+burn_rates_path = "Sch Conf Burn Rates.csv"
+
+#formats the charts are saved in ("png", "svg" and/or "pdf"), and processes drawing them (None uses one per core, 
+#1 draws them one after another, worth it for many departments or a backfill's weeks)
+plot_formats = ["png"]
+plot_workers = 1
+
+defaults = {"cache_dir": cache_dir, "calc_engine": calc_engine, "ingest_chunksize": ingest_chunksize, "csv_engine": csv_engine, 
+            "load_workers": load_workers, "report_workers": report_workers, "report_pool": report_pool, "metrics": metrics, "metrics_memory": metrics_memory, 
+            "profile_dir": profile_dir, "low_memory": low_memory, "forecast_trials": forecast_trials, 
+            "burn_rates_path": burn_rates_path, "plot_formats": plot_formats, "plot_workers": plot_workers}
+
+
+def configure(**options): 
+    """
+    Change settings, raises TypeError for a name that isn't a setting
+    """
+    for name, value in options.items(): 
+        if name not in defaults: 
+            raise TypeError(f"unknown setting {name!r}, expected one of {list(defaults)}")
+        globals()[name] = value
+
+
+def current(): 
+    """
+    Current value of every setting, e.g. to pass on to worker processes
+    """
+    return {name: globals()[name] for name in defaults}
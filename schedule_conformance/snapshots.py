@@ -0,0 +1,221 @@
+"""
+Snapshot diffs and timelines
+
+diff_snapshots compares two snapshots of MO operations (e.g. yesterday's and today's export) with one 
+hash join on (Order, OP Seq), keeping export order, and returns a changelog of what completed, was added, progressed or 
+was rescheduled. 
+
+MO operations for the week are kept in one dataframe per list (scheduled, not scheduled) indexed by 
+(Order, OP Seq), the not scheduled list by (Order, Description) like the original report, with the attribute 
+columns of each operation and one column per snapshot (weekday) for each measure, e.g. ("Mach hrs rem", "Tuesday"). An operation that isn't in a snapshot has NaN there.
+Each snapshot column is built by applying that day's changelog to the previous column, and status and 
+progress are then column lookups and vectorized column differences instead of re-merging every day's dataframe.
+The columns of every snapshot of the week are allocated when the timeline is started and each day is assigned
+into its columns, so the week's frame is held once instead of copied every day (the not scheduled list still 
+appends the rows of operations first seen that day). Snapshots after the latest one added are NaN.
+Timelines are float64 even when the exports are float32 (low memory mode), so every total is the same.
+
+"""
+
+import numpy as np
+import pandas as pd
+
+from .departments import dept_facilities, facility_departments
+from .ingest import load_clean_export, widen_float32
+
+
+timeline_keys = ["Order", "OP Seq"]
+scheduled_attributes = ["Description", "Item", "Facility", "Dept"]
+scheduled_measures = ["Qty Rem", "Mach hrs rem"]        #Qty Rem is always > 0 on the scheduled list, so it also marks presence
+not_sched_keys = ["Order", "Description"]               #an operation whose OP Seq changes (or is missing) stays one row
+not_sched_attributes = ["Item", "Facility"]
+not_sched_measures = ["Qty Rem MO", "Mach hrs rem"]
+change_types = ["completed", "added", "progressed", "rescheduled"]
+
+
+def diff_snapshots(old, new, measures, attributes = ("Description", "Item", "Facility"), keys = timeline_keys): 
+    """
+    Compare two snapshots of MO operations
+
+    Parameters
+    ----------
+    old : dataframe or None
+        earlier snapshot, None if there is none (every operation in new is added).
+    new : dataframe
+        later snapshot.
+    measures : list
+        numeric columns compared for progress, e.g. ["Qty Rem", "Mach hrs rem"].
+    attributes : list
+        columns copied to the changelog to identify the operation (taken from new, or old where new doesn't have it).
+    keys : list
+        columns identifying an operation.
+
+    Returns
+    -------
+    changes : dataframe
+        changelog with one row per operation and change, columns: keys, Change, attributes, 
+        and "<column> old"/"<column> new" for the measures and Sch comp (NaN where the operation isn't in that snapshot). 
+        Change is one of
+            completed: in old but not in new, or completed (Act comp set) since old
+            added: in new but not in old
+            progressed: a measure changed
+            rescheduled: the scheduled completion date (Sch comp) moved
+    """
+    if old is None: 
+        old = new.iloc[:0]
+    dates = [col for col in ["Sch comp"] if col in old.columns and col in new.columns]
+    done = [col for col in ["Act comp"] if col in old.columns and col in new.columns]
+    attributes = [col for col in attributes if col in new.columns]
+    compared = list(measures) + dates
+    old_part = old[keys + attributes + compared + done].drop_duplicates(keys)
+    new_part = new[keys + attributes + compared + done].drop_duplicates(keys)
+    #outer join that keeps export order: old operations, then operations only in new, each matched by hash join
+    only_new = ~pd.MultiIndex.from_frame(new_part[keys]).isin(pd.MultiIndex.from_frame(old_part[keys]))
+    all_keys = pd.concat([part for part in (old_part[keys], new_part.loc[only_new, keys]) if not part.empty] or [old_part[keys]], 
+                         ignore_index = True)
+    merged = all_keys.merge(old_part, on = keys, how = "left", indicator = "in old")
+    merged = merged.merge(new_part, on = keys, how = "left", suffixes = (" old", " new"), indicator = "in new")
+
+    in_old = merged["in old"] == "both"
+    in_new = merged["in new"] == "both"
+    both = in_old & in_new
+    def changed(cols): 
+        mask = pd.Series(False, index = merged.index)
+        for col in cols: 
+            before, after = merged[col + " old"], merged[col + " new"]
+            mask |= (before != after) & ~(before.isna() & after.isna())
+        return mask
+    completed = in_old & ~in_new
+    for col in done: 
+        completed |= both & merged[col + " new"].notna() & merged[col + " old"].isna()
+    masks = {"completed": completed, "added": in_new & ~in_old, "progressed": both & changed(measures), 
+             "rescheduled": both & changed(dates)}
+
+    for col in attributes: 
+        before, after = merged[col + " old"], merged[col + " new"]
+        if isinstance(after.dtype, pd.CategoricalDtype):                  #categories can differ between snapshots
+            before, after = before.astype(object), after.astype(object)
+        merged[col] = after.where(after.notna(), before)
+    columns = keys + ["Change"] + attributes + [col + suffix for col in compared for suffix in (" old", " new")]
+    parts = [merged[mask].assign(Change = change) for change, mask in masks.items() if mask.any()]
+    changes = pd.concat(parts, ignore_index = True) if parts else merged.iloc[:0].assign(Change = "")
+    return changes[columns]
+
+
+def diff_exports(old_path, new_path): 
+    """
+    Changelog of schedule conformance MO operations between two export files (see diff_snapshots)
+    """
+    return diff_snapshots(load_clean_export(old_path), load_clean_export(new_path), ["Qty Rem", "Qty Rem MO", "Mach hrs rem"], 
+                          ["Description", "Item", "Facility", "Dept", "OP Status"])
+
+
+def add_snapshot(timeline, snapshot, changes, attributes, measures, new_rows = True, keys = timeline_keys, snapshots = None): 
+    """
+    Add a snapshot to a timeline by applying its changelog to the previous snapshot, in place when its columns 
+    are allocated
+
+    Parameters
+    ----------
+    timeline : dataframe or None
+        existing timeline, None to start a new one.
+    snapshot : string
+        label of the snapshot (weekday name).
+    changes : dataframe
+        changelog from diff_snapshots(previous snapshot, this snapshot), with the attributes and measures.
+    attributes : list
+        columns stored once per operation, taken from the snapshot the operation is added in. 
+        The label of that snapshot is stored as the "First seen" attribute.
+    measures : list
+        columns stored for every snapshot.
+    new_rows : bool
+        add operations that aren't in the timeline yet. False only updates operations already in it 
+        (e.g. the scheduled list is fixed by monday's snapshot).
+    keys : list
+        columns identifying an operation, the keys changes was diffed on.
+    snapshots : list, optional
+        labels of every snapshot of the timeline in order (e.g. the weekdays), their (measure, snapshot) columns 
+        are allocated when the timeline is started. None adds each snapshot's columns when it's added.
+
+    Returns
+    -------
+    timeline : dataframe
+        timeline with the (measure, snapshot) column of each measure filled in.
+    """
+    changes = changes.drop_duplicates(keys).set_index(keys)         #values after the change are the same in every row of an operation
+    after = widen_float32(changes[[measure + " new" for measure in measures]].set_axis(measures, axis = 1))
+    if timeline is None: 
+        values = after.iloc[:0].copy()
+    else: 
+        labels = list(timeline[measures[0]].columns)
+        previous = labels[labels.index(snapshot) - 1] if snapshot in labels else labels[-1]
+        values = pd.DataFrame({measure: timeline[(measure, previous)] for measure in measures})   #unchanged operations carry over
+
+    known = changes.index.intersection(values.index, sort = False)
+    values.loc[known] = after.loc[known]
+    if timeline is None or new_rows: 
+        new = changes.index[changes["Change"] == "added"].difference(values.index, sort = False)
+        rows = changes.loc[new, attributes].assign(**{"First seen": snapshot})
+        rows.columns = pd.MultiIndex.from_product([attributes + ["First seen"], [""]])
+        if timeline is None: 
+            timeline = snapshot_columns(rows, measures, snapshots or [snapshot])
+        elif len(new): 
+            timeline = pd.concat([timeline, rows])                  #only days that add operations append rows
+        values = pd.concat([values, after.loc[new]])
+    if (measures[0], snapshot) not in timeline: 
+        timeline = snapshot_columns(timeline, measures, [snapshot])
+    timeline.loc[:, [(measure, snapshot) for measure in measures]] = values.reindex(timeline.index).to_numpy()
+    return timeline
+
+
+def snapshot_columns(timeline, measures, snapshots): 
+    """
+    Timeline with empty (measure, snapshot) columns added for the snapshots, in one float64 block
+    """
+    columns = pd.MultiIndex.from_tuples([(measure, snapshot) for snapshot in snapshots for measure in measures])
+    empty = pd.DataFrame(np.full((len(timeline), len(columns)), np.nan), index = timeline.index, columns = columns)
+    return pd.concat([timeline, empty], axis = 1)
+
+
+def first_values(timeline, measure): 
+    """
+    Value of a measure in the snapshot each operation was first seen in
+    """
+    wide = timeline[measure]
+    positions = wide.columns.get_indexer(timeline["First seen"])
+    return pd.Series(wide.to_numpy()[np.arange(len(wide)), positions], index = timeline.index)
+
+
+def snapshot_mos(timeline, snapshot, attributes, measures): 
+    """
+    Operations in a timeline that are present in a snapshot
+
+    Returns
+    -------
+    df : dataframe
+        one row per operation with the key, attribute and the snapshot's measure columns, in timeline order.
+    """
+    present = timeline[(measures[0], snapshot)].notna()
+    df = timeline.loc[present, attributes].droplevel(1, axis = 1)
+    for measure in measures: 
+        df[measure] = timeline.loc[present, (measure, snapshot)]
+    return df.reset_index()
+
+
+def snapshot_status(timeline, snapshot): 
+    """
+    MO count and machine hours remaining of each department in a snapshot
+
+    Returns
+    -------
+    counts, hours : series
+        indexed by department (every department in dept_facilities).
+    """
+    present = timeline[(scheduled_measures[0], snapshot)].notna()
+    dept = timeline["Facility"].map(facility_departments)
+    counts = present.groupby(dept).sum().reindex(list(dept_facilities), fill_value = 0)
+    #each department's hours are summed in timeline order like the original report, a groupby sum is compensated 
+    #and differs from it in the last digits
+    hours = timeline[("Mach hrs rem", snapshot)].where(present)
+    hours = pd.Series({key: hours[(dept == key).to_numpy()].sum() for key in dept_facilities}, dtype = "float64")
+    return counts, hours
@@ -0,0 +1,462 @@
+"""
+Schedule conformance status of a week
+
+compute_week calculates everything from a week's exports (scheduled and not scheduled MOs of each day, 
+the scheduled timeline and each department's status and progress), compute_status is the quick check 
+of each department's status without writing any workbooks or plots.
+"""
+
+import warnings
+
+import pandas as pd
+
+from . import settings
+from . import metrics
+from .departments import dept_facilities, split_by_dept
+from .ingest import interned_text, load_exports, widen_float32
+from .snapshots import (add_snapshot, diff_snapshots, first_values, not_sched_attributes, not_sched_keys, not_sched_measures, 
+                        scheduled_attributes, scheduled_measures, snapshot_mos, snapshot_status)
+from .weeks import beginning_end_of_week, current_week, export_path, weekday_name_to_num, weekdays
+
+
+def filter_not_sched(df, beginning_of_week, end_of_week, today = None, engine = "vectorized"): 
+    """
+    Select MOs with last activity in the current week that were not completed before today
+
+    Parameters
+    ----------
+    df : dataframe
+        cleaned export, already limited to MOs that are not on the scheduled list.
+    beginning_of_week, end_of_week : timestamp
+        sunday before and after the week.
+    today : timestamp
+        MOs completed before this are dropped, None uses the current date and time.
+    engine : string
+        "vectorized" uses boolean masks, "rowwise" is the original apply based version.
+
+    Returns
+    -------
+    df : dataframe
+        filtered dataframe.
+    """
+    if today is None: 
+        today = pd.to_datetime('today')
+    if engine == "rowwise": 
+        df = df[df.apply(lambda row: beginning_of_week<row["Last activity"] < end_of_week,  axis = 1)]  #select MOs where last activity is in the current week
+        df = df[df.apply(lambda row: not(row["Act comp"] < today),  axis = 1)]
+        return df
+    in_week = (df["Last activity"] > beginning_of_week) & (df["Last activity"] < end_of_week)  #last activity in the current week (NaT is False)
+    not_done = ~(df["Act comp"] < today)                                                       #not completed before today (NaT is kept)
+    return df[in_week & not_done]
+
+
+#columns of the scheduled list, and of the not scheduled list in low memory mode (the columns diff_snapshots 
+#and filter_not_sched use)
+scheduled_columns = ["Order", "OP Seq", "Description", "Item", "Qty Rem", "Facility", "Dept", "Mach hrs rem", "Sch comp"]
+not_sched_columns = not_sched_keys + not_sched_attributes + not_sched_measures + ["Sch comp", "Act comp", "Last activity"]
+
+
+def split_day(weekday_name, df, monday_scheduled, beginning_of_week, end_of_week, today = None, engine = "vectorized"): 
+    """
+    Split a day's cleaned export into its scheduled and not scheduled MOs
+
+    Parameters
+    ----------
+    weekday_name : string
+        weekday (or other label) of the export.
+    df : dataframe
+        cleaned export of that day.
+    monday_scheduled : dataframe or None
+        monday's scheduled MOs (LRP_by_day["Monday"]), None for the week's first export, which sets the scheduled list.
+    beginning_of_week, end_of_week, today : timestamp
+        passed to filter_not_sched.
+    engine : string
+        passed to filter_not_sched.
+
+    Returns
+    -------
+    scheduled, not_scheduled : dataframe
+        the day's entries of LRP_by_day and not_sched_by_day.
+    """
+    #the filters are combined into one mask, so the export is only copied once for each list
+    with metrics.stage("split day", rows_in = len(df), weekday = weekday_name) as record: 
+        mask = df["Act comp"].isna().to_numpy()            #select only not complete MOs
+        metrics.count("not complete", record["rows_in"], int(mask.sum()))
+        if monday_scheduled is None:
+            #if today is monday, find only scheduled MOs this week by using sch comp date
+            rows = int(mask.sum())
+            mask &= (df["Sch comp"] <= end_of_week).to_numpy()
+            metrics.count("scheduled this week", rows, int(mask.sum()))
+        rows = int(mask.sum())
+        mask &= (df["Qty Rem"] > 0).to_numpy()             #grab only rows where qty remaining is >0
+        metrics.count("qty remaining", rows, int(mask.sum()))
+        if settings.low_memory and monday_scheduled is not None: 
+            #only monday's MOs are used from the other days (see update_status), don't keep the rest
+            mask &= df["Order"].isin(monday_scheduled["Order"]).to_numpy()
+        df2 = df
+        df = df.loc[mask, scheduled_columns]              #grab only columns needed 
+        if monday_scheduled is None: 
+            monday_scheduled = df
+        not_in_scheduled = ~df2["Order"].isin(monday_scheduled["Order"])   #for not scheduled, select only MOs not in scheduled
+        df2 = df2.loc[not_in_scheduled, not_sched_columns if settings.low_memory else df2.columns]
+        metrics.count("not on monday's list", record["rows_in"], len(df2))
+        rows = len(df2)
+        df2 = filter_not_sched(df2, beginning_of_week, end_of_week, today, engine)
+        metrics.count("not scheduled activity this week", rows, len(df2))
+        if settings.low_memory: 
+            df.index, df2.index = pd.RangeIndex(len(df)), pd.RangeIndex(len(df2))   #line numbers of the export aren't used
+        record["rows_out"] = len(df) + len(df2)
+    return df, df2
+
+
+#load files for each weekday up to today
+@metrics.profiled
+def create_by_day_dictionaries(weekday, week, beginning_of_week, end_of_week, today = None, export_dir = ".", 
+                               engine = "vectorized", exports = None, rejects = None):
+    """
+    Parameters
+    ----------
+    weekday : int
+        number of current weekday.
+    week : int
+        week number in the export file names.
+    beginning_of_week, end_of_week, today : timestamp
+        passed to filter_not_sched.
+    export_dir : string
+        folder with the week's exports.
+    engine : string
+        passed to filter_not_sched.
+    exports : dictionary, optional
+        cleaned exports already loaded, weekday name as the key. Days that aren't in it are loaded from export_dir.
+    rejects : dictionary, optional
+        date values of the loaded exports that couldn't be parsed are stored in it (see ingest.record_rejects).
+
+    Returns
+    -------
+    LRP_by_day : dictionary
+        dictionary with a key, dataframe of scheduled MOs for each weekday.
+    not_sched_by_day : dictionary
+        dictionary with a key: dataframe of not scheduled MOs for each weekday.
+
+    """
+    LRP_by_day = {}
+    not_sched_by_day = {}
+    #the exports are loaded at the same time (only new/changed exports are parsed and cleaned), and split in weekday order
+    to_load = [name for name in weekdays[:weekday+1] if exports is None or name not in exports]
+    loading = load_exports([export_path(name, week, export_dir) for name in to_load], rejects = rejects)
+    for number in range(weekday+1): 
+        #loop through all weekdays so far in week, for each day add df of MOs to dictionary
+        #add to either scheduled MOs dict (LRP by day) or not scheduled MOs dict
+        weekday_name = weekdays[number]
+        if exports is not None and weekday_name in exports: 
+            df = exports[weekday_name]
+        else: 
+            df = next(loading)
+        LRP_by_day[weekday_name], not_sched_by_day[weekday_name] = split_day(
+            weekday_name, df, LRP_by_day.get("Monday"), beginning_of_week, end_of_week, today, engine)
+    interned_text.clear()           #the week's frames share their text now, the lookup isn't needed (low memory mode)
+    return LRP_by_day, not_sched_by_day
+
+
+def diff_results(rowwise, vectorized, label = ""): 
+    """
+    Compare results of the rowwise and vectorized engines
+
+    Parameters
+    ----------
+    rowwise, vectorized : dataframe, or dictionary/tuple of dataframes
+        results of the same function run with each engine.
+    label : string
+        name of the result, used in the messages.
+
+    Returns
+    -------
+    differences : list
+        one message per dataframe that doesn't match, empty when the results are the same.
+    """
+    if isinstance(rowwise, tuple): 
+        differences = []
+        for number, (old, new) in enumerate(zip(rowwise, vectorized)): 
+            differences += diff_results(old, new, f"{label}[{number}]")
+        return differences
+    if isinstance(rowwise, dict): 
+        if list(rowwise) != list(vectorized): 
+            return [f"{label}: keys differ {list(rowwise)} != {list(vectorized)}"]
+        differences = []
+        for key in rowwise: 
+            differences += diff_results(rowwise[key], vectorized[key], f"{label}[{key}]")
+        return differences
+    try: 
+        pd.testing.assert_frame_equal(rowwise, vectorized, check_dtype = False)
+    except AssertionError as error: 
+        return [f"{label}: {error}"]
+    return []
+
+
+def run_engine(function, *args, **kwargs): 
+    """
+    Run a calculation with the engine set in calc_engine
+
+    In "compare" mode the function is run with both engines, any differences are reported with 
+    warnings and the vectorized result is returned.
+    """
+    if settings.calc_engine != "compare": 
+        return function(*args, engine = settings.calc_engine, **kwargs)
+    rowwise = function(*args, engine = "rowwise", **kwargs)
+    vectorized = function(*args, engine = "vectorized", **kwargs)
+    for difference in diff_results(rowwise, vectorized, function.__name__): 
+        warnings.warn("rowwise and vectorized engines differ - " + difference)
+    return vectorized
+
+
+def scheduled_mos_on(timeline, weekday): 
+    """
+    Scheduled MOs (from monday's list) still open on a weekday, split into departments
+
+    Parameters: timeline (dataframe): scheduled timeline, weekday (string)
+
+    returns: dictionary where the key is the department and the value is a df of that department's 
+    open scheduled MO operations
+    """
+    return split_by_dept(snapshot_mos(timeline, weekday, scheduled_attributes, scheduled_measures))
+
+
+@metrics.profiled
+def update_status(weekday, LRP_by_day, timeline, status):
+    """
+    add a weekdays scheduled MOs to the scheduled timeline, and update status for each department
+
+    Parameters: weekday (string), LRP_by_day (dictionary of each weekday's scheduled MOs), 
+    timeline (dataframe, None on monday), status (dictionary of each department's status df)
+
+    returns the updated timeline, and updates the status dictionary 
+    """
+    with metrics.stage("update status", rows_in = len(LRP_by_day[weekday]), weekday = weekday) as record: 
+        previous = None if weekday == "Monday" else LRP_by_day[weekdays[weekday_name_to_num(weekday)-1]]
+        changes = diff_snapshots(previous, LRP_by_day[weekday], scheduled_measures, scheduled_attributes)
+        #only include MO operations that were in monday's MO list
+        timeline = add_snapshot(timeline, weekday, changes, scheduled_attributes, 
+                                scheduled_measures, new_rows = weekday == "Monday", snapshots = weekdays[:6])
+        counts, hours = snapshot_status(timeline, weekday)
+        record["rows_out"] = len(timeline)
+    for key in dept_facilities: 
+        metrics.value("MO count", counts[key], dept = key, weekday = weekday)
+        metrics.value("hours", hours[key], dept = key, weekday = weekday)
+        todays_status = {"Weekday": [weekday], "MO Count": [counts[key]], "Hours":[hours[key]]}  #create days status
+        todays_status = pd.DataFrame(todays_status)
+        if weekday == "Monday": 
+            status[key] = todays_status
+        else: 
+            status[key] = pd.concat([status[key], todays_status], ignore_index = True)  #append tuesday status to existing department df in status dictionary
+    return timeline
+
+
+def add_not_sched_day(timeline, weekday, previous, not_scheduled): 
+    """
+    Add a day's not scheduled MOs to the not scheduled timeline
+
+    The day's changes from the previous day's not scheduled MOs (None on monday) are applied, new MO operations 
+    are added with that day's qty and hrs as their initial values. Returns the updated timeline.
+    """
+    changes = diff_snapshots(previous, not_scheduled, not_sched_measures, not_sched_attributes, not_sched_keys)
+    return add_snapshot(timeline, weekday, changes, not_sched_attributes, not_sched_measures, keys = not_sched_keys, 
+                        snapshots = weekdays[:6])
+
+
+#loops through not scheduled by day dictionary, adds each day to a timeline which keeps the first occurence of each MO operation
+@metrics.profiled
+def setup_not_sched_statuses(not_scheduled_dict, engine = "vectorized"): 
+    """
+    Find the not-scheduled MOs for each department
+
+    Parameters: 
+    not_scheduled_dict (dictionary): dictionary where key is day of the week and value is a df of not-scheduled MOs for that day
+    engine (string): "vectorized" builds the not scheduled timeline, "rowwise" runs the original calculation 
+    (see reference_not_sched_statuses), the reference the timeline is compared with in "compare" mode
+
+    returns: dept_dict (dictionary): dictionary where the key is the department and the value is a df of not-scheduled MOs for the week for that
+    department, and the progress of those MOs through the week 
+    
+    """
+    if engine == "rowwise": 
+        return reference_not_sched_statuses(not_scheduled_dict)
+    timeline = None
+    previous = None
+    for key, value in not_scheduled_dict.items(): 
+        timeline = add_not_sched_day(timeline, key, previous, value)
+        previous = value
+    dept_dict = not_sched_progress(timeline, list(not_scheduled_dict)[-1], engine)
+    metrics.count("not scheduled", sum(len(value) for value in not_scheduled_dict.values()), 
+                  sum(len(value) for value in dept_dict.values()))
+    return dept_dict
+
+
+def reference_not_sched_statuses(not_scheduled_dict): 
+    """
+    The original not scheduled calculation: every day's not scheduled MOs concatenated, keeping the first 
+    occurence of each MO and description, merged with the last day's for the end qty and hrs
+
+    Each merge and drop_duplicates goes over the whole week, which is why the timeline replaced it, 
+    but it's kept as the reference setup_not_sched_statuses is checked against.
+    """
+    for key, value in not_scheduled_dict.items(): 
+        df_new_today = widen_float32(value[["Order", "Description", "Item", "Facility", "Qty Rem MO", "Mach hrs rem"]])
+        df_new_today = df_new_today.astype({"Facility": object})          #facility codes were text in the original
+        df_new_today.columns = ["MO", "Description", "Item", "Facility", "Initial Qty", "Initial Mach Hrs"]
+        if key == "Monday": 
+            df = df_new_today
+        else: 
+            df = pd.concat([df, df_new_today], ignore_index = True)
+            df = df.drop_duplicates(subset = ["MO", "Description"])
+
+    #find the current day's qty and hrs remaining for MOs in df above, add to df as the end qty and hours
+    df2 = not_scheduled_dict[list(not_scheduled_dict)[-1]]
+    df2 = widen_float32(df2.loc[df2["Order"].isin(df["MO"]), ["Order", "Description", "Qty Rem MO", "Mach hrs rem"]])
+    df2.columns = ["MO", "Description","End Qty", "End Mach Hrs"]
+    df = pd.merge(df, df2, on = ["MO", "Description"], how = 'left')
+    df = df.fillna({col: 0 for col in df.columns if df[col].dtype != "category"})   #categorical columns can't hold 0
+    df["Qty Comp"] = df.apply(lambda row: row["Initial Qty"] - row["End Qty"], axis = 1)                  #calculate qty complete so far
+    df["Mach Hrs Comp"] = df.apply(lambda row: row["Initial Mach Hrs"] - row["End Mach Hrs"], axis = 1)   #calculate hrs complete so far
+    return split_by_dept(df)
+
+
+def not_sched_progress(timeline, today, engine = "vectorized"): 
+    """
+    Each department's not scheduled MOs and their progress from the day they were first seen to today
+
+    Parameters: 
+    timeline (dataframe): not scheduled timeline, see add_not_sched_day
+    today (string): last weekday in the timeline
+    engine (string): passed on from setup_not_sched_statuses
+
+    returns: dept_dict (dictionary): department as the key and a df of its not scheduled MOs as the value
+    """
+    #the current day's qty and hrs remaining (NaN if the operation isn't in today's export) are the end qty and hours
+    df = timeline[not_sched_attributes].droplevel(1, axis = 1)
+    df["Initial Qty"] = first_values(timeline, "Qty Rem MO")
+    df["Initial Mach Hrs"] = first_values(timeline, "Mach hrs rem")
+    df["End Qty"] = timeline[("Qty Rem MO", today)]
+    df["End Mach Hrs"] = timeline[("Mach hrs rem", today)]
+    df = df.reset_index().rename(columns = {"Order": "MO"})
+
+    #calculate difference (progress)
+    df = df.fillna({col: 0 for col in df.columns if df[col].dtype != "category"})   #categorical columns can't hold 0
+    cols_to_numeric = ['Initial Qty', "Initial Mach Hrs", "End Qty", "End Mach Hrs"]  #convert two numeric column to numbers from objects
+    df[cols_to_numeric] = df[cols_to_numeric].apply(pd.to_numeric)
+    if engine == "rowwise": 
+        df["Qty Comp"] = df.apply(lambda row: row["Initial Qty"] - row["End Qty"], axis = 1)                  #calculate qty complete so far
+        df["Mach Hrs Comp"] = df.apply(lambda row: row["Initial Mach Hrs"] - row["End Mach Hrs"], axis = 1)   #calculate hrs complete so far
+    else: 
+        df["Qty Comp"] = df["Initial Qty"] - df["End Qty"]                  #calculate qty complete so far
+        df["Mach Hrs Comp"] = df["Initial Mach Hrs"] - df["End Mach Hrs"]   #calculate hrs complete so far
+    dept_dict = split_by_dept(df)                                                                        #split into dfs by department, store in dictionary 
+    for key, value in dept_dict.items(): 
+        metrics.value("not scheduled MOs", len(value), dept = key)
+    return dept_dict
+    
+def calc_progress(df):
+    """
+    Calculate progress of MOs and Hrs throughouth the week
+    Parameters: 
+    df (dataframe): df with columns [Weekday, MO Count, Hours]
+
+    Modifies the df, adds columns [MOs Complete, Hours Complete, %MOs Complete, %Hrs Complete]
+    Calulates values from difference between rows
+    
+    """
+    
+    #Calculate progress of MOs and Hrs throughouth the week
+    if len(df) <= 1: 
+        return 
+    df["MOs Complete"] = df["MO Count"] - df["MO Count"].shift(-1)   #create a new column of number of MOs completed each day
+    df["MOs Complete"] = df["MOs Complete"].cumsum()                 #change that column to cumulative sum of MOs completed
+    df["Hours Complete"] = df["Hours"] - df["Hours"].shift(-1)       #create a new column of number of hrs completed each day
+    df["Hours Complete"] =df["Hours Complete"].cumsum()              #change that column to a cumulative sum of hrs completed
+    monday_mos = df["MO Count"].iloc[0]                              #find mondays # of MOs 
+    monday_hrs = df["Hours"].iloc[0]                                 #find mondays # of hours
+    df["% MOs Complete"] = round((df["MOs Complete"]/monday_mos)*100, 2)   #create a new column calculating % of MOs completed 
+    df["% Hrs Complete"] = round((df["Hours Complete"]/monday_hrs)*100, 2)  #create a new column calculating % of hrs completed
+
+
+#calculate schedule conformance progress 
+def run_status_calcs(status): 
+    for key, value in status.items(): 
+        calc_progress(status[key])
+
+
+@metrics.profiled
+def compute_week(week, weekday_number, beginning_of_week, end_of_week, today = None, export_dir = ".", rejects = None): 
+    """
+    Calculate a week's schedule conformance from its exports, monday up to weekday_number
+
+    Parameters
+    ----------
+    week : int
+        week number in the export file names.
+    weekday_number : int
+        number of the last weekday to include.
+    beginning_of_week, end_of_week : timestamp
+        sunday before and after the week.
+    today : timestamp
+        not scheduled MOs completed before this are dropped, None uses the current date and time.
+    export_dir : string
+        folder with the week's exports.
+    rejects : dictionary, optional
+        date values of the week's exports that couldn't be parsed are stored in it, export file name as the key 
+        (see reports.write_rejects).
+
+    Returns
+    -------
+    LRP_by_day, not_sched_by_day : dictionary
+        scheduled and not scheduled MOs of each weekday.
+    scheduled_timeline : dataframe
+        monday's scheduled MO operations with their qty and hours remaining each day.
+    status : dictionary
+        each department's status df, with progress columns.
+    not_scheduled_dict : dictionary
+        each department's not scheduled MOs and their progress.
+    """
+    with metrics.stage("compute week", week = week): 
+        LRP_by_day, not_sched_by_day = run_engine(create_by_day_dictionaries, weekday_number, week, beginning_of_week, 
+                                                  end_of_week, today, export_dir, rejects = rejects)
+        metrics.footprint("scheduled by day", LRP_by_day)
+        metrics.footprint("not scheduled by day", not_sched_by_day)
+        scheduled_timeline = None
+        status = {}
+        for number in range(weekday_number+1):
+            day = weekdays[number]
+            scheduled_timeline = update_status(day, LRP_by_day, scheduled_timeline, status)
+        metrics.footprint("scheduled timeline", scheduled_timeline)
+        with metrics.stage("not scheduled"): 
+            not_scheduled_dict = run_engine(setup_not_sched_statuses, not_sched_by_day)       
+        metrics.footprint("not scheduled", not_scheduled_dict)
+        with metrics.stage("progress"): 
+            run_status_calcs(status)
+    return LRP_by_day, not_sched_by_day, scheduled_timeline, status, not_scheduled_dict
+
+
+def compute_status(week = None, weekday = None, year = None, export_dir = ".", today = None): 
+    """
+    Each department's schedule conformance status, without writing any workbooks or plots
+
+    Parameters
+    ----------
+    week : int
+        week number in the export file names, None uses the current ISO week.
+    weekday : string or int
+        last weekday to include (name or number), None uses today.
+    year : int
+        ISO year of the week, None uses the current year.
+    export_dir : string
+        folder with the week's exports.
+    today : timestamp
+        passed to compute_week.
+
+    Returns
+    -------
+    status : dictionary
+        department as the key, df with the MO count, hours and progress of each weekday as the value.
+    """
+    year, week, weekday = current_week(week, weekday, year)
+    beginning_of_week, end_of_week = beginning_end_of_week(week, year)
+    return compute_week(week, weekday, beginning_of_week, end_of_week, today, export_dir)[3]
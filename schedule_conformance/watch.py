@@ -0,0 +1,192 @@
+"""
+Watch mode
+
+Polls a folder for the daily exports ('<Weekday> Sched Conform WK<n>.csv') and updates the week's status as
+soon as each one lands, without editing week/weekday or re-running the script. The week being watched is
+the one with the newest export, and an export is used once its size and modified time stop changing between
+two polls (the ERP may still be writing it).
+
+The previous days' results are kept in memory (each day's scheduled and not scheduled MOs, the scheduled and
+not scheduled timelines and the status tables), so a new export is the only file read and only its changes
+are applied. Only the workbooks whose contents changed are rewritten (the monday workbooks e.g. are written
+once), and the plot only when the status changed. If an export that was already used is replaced, the week
+is calculated again from its exports (unchanged ones come from the cache).
+
+Polling the folder listing every few seconds costs next to nothing, and works the same on network shares, 
+where file system notifications (inotify) often don't arrive.
+"""
+
+import os
+import time
+import warnings
+
+from . import metrics
+from . import settings
+from .backfill import export_pattern, export_year
+from .ingest import load_clean_export
+from .status import (add_not_sched_day, diff_results, not_sched_progress, reference_not_sched_statuses, run_engine, 
+                     run_status_calcs, split_day, update_status)
+from .weeks import beginning_end_of_week, weekdays
+
+
+def find_exports(export_dir): 
+    """
+    Exports in a folder (not its subfolders)
+
+    Returns
+    -------
+    exports : dictionary
+        week as the key, and a dictionary of weekday name: (path, (size, modified time)) as the value.
+    """
+    exports = {}
+    with os.scandir(export_dir) as entries: 
+        for entry in entries: 
+            match = export_pattern.match(entry.name)
+            if match and entry.is_file(): 
+                stat = entry.stat()
+                day = match.group(1).capitalize()
+                exports.setdefault(int(match.group(2)), {})[day] = (entry.path, (stat.st_size, stat.st_mtime_ns))
+    return exports
+
+
+def new_week_state(week, year, written = None): 
+    """
+    Empty in-memory state of a week, see apply_day
+    """
+    beginning_of_week, end_of_week = beginning_end_of_week(week, year)
+    return {"week": week, "year": year, "beginning_of_week": beginning_of_week, "end_of_week": end_of_week, 
+            "days": {}, "LRP_by_day": {}, "not_sched_by_day": {}, "scheduled_timeline": None, "not_sched_timeline": None, 
+            "status": {}, "not_scheduled_dict": {}, "rejects": {}, "written": {} if written is None else written}
+
+
+def apply_day(state, weekday_name, path, today = None): 
+    """
+    Add the next day's export to a week's state
+
+    Only this export is read and split, its changes are added to the scheduled and not scheduled timelines, and
+    the day's row is added to each department's status. The results are the same as compute_week up to this day, 
+    and in "compare" mode they are checked like compute_week's: the day is split with both engines and the not 
+    scheduled MOs are compared with the original calculation of the week so far, differences are warned about.
+
+    Parameters
+    ----------
+    state : dictionary
+        week's state from new_week_state, with every earlier weekday applied.
+    weekday_name : string
+        weekday of the export.
+    path : string
+        path of the export.
+    today : timestamp
+        passed to split_day, None uses the current date and time.
+    """
+    engine = "rowwise" if settings.calc_engine == "rowwise" else "vectorized"
+    number = weekdays.index(weekday_name)
+    previous = state["not_sched_by_day"][weekdays[number-1]] if number else None
+    scheduled, not_scheduled = run_engine(split_day, weekday_name, load_clean_export(path, rejects = state["rejects"]), 
+                                          state["LRP_by_day"].get("Monday"), state["beginning_of_week"], 
+                                          state["end_of_week"], today)
+    state["LRP_by_day"][weekday_name] = scheduled
+    state["not_sched_by_day"][weekday_name] = not_scheduled
+    state["scheduled_timeline"] = update_status(weekday_name, state["LRP_by_day"], state["scheduled_timeline"], state["status"])
+    state["not_sched_timeline"] = add_not_sched_day(state["not_sched_timeline"], weekday_name, previous, not_scheduled)
+    state["not_scheduled_dict"] = not_sched_progress(state["not_sched_timeline"], weekday_name, engine)
+    if settings.calc_engine == "compare": 
+        reference = reference_not_sched_statuses(state["not_sched_by_day"])
+        for difference in diff_results(reference, state["not_scheduled_dict"], "setup_not_sched_statuses"): 
+            warnings.warn("rowwise and vectorized engines differ - " + difference)
+    run_status_calcs(state["status"])
+
+
+def describe_update(update): 
+    """
+    One line summary of an update of watch, e.g. 'week 23 Tuesday: 3 workbooks written in 1.2s'
+    """
+    return f"week {update['week']} {', '.join(update['days'])}: {len(update['written'])} workbooks written in {update['seconds']:.1f}s"
+
+
+def watch(export_dir = ".", interval = 2, year = None, plot = True, metrics_report = None, prometheus_file = None, 
+          max_polls = None, on_update = None): 
+    """
+    Update the status and reports each time a new daily export lands in export_dir, until interrupted
+
+    Parameters
+    ----------
+    export_dir : string
+        folder the exports are saved to, the reports are written to the working folder.
+    interval : float
+        seconds between polls of the folder.
+    year : int
+        ISO year of the watched weeks, None uses the year of each week's exports.
+    plot : bool
+        draw the status plot.
+    metrics_report, prometheus_file : string
+        paths of the run report and Prometheus file written after each update when settings.metrics is on.
+    max_polls : int
+        stop after this many polls, None keeps watching.
+    on_update : function, optional
+        called after each update with its summary, a dictionary with the week, the days applied, the workbooks 
+        written and the seconds they took (see describe_update).
+
+    Returns
+    -------
+    state : dictionary
+        the watched week's state (see new_week_state), None if no monday export was found.
+    """
+    from .reports import write_reports
+
+    state = None
+    last_seen = {}                  #path: (size, modified time) at the previous poll
+    failed = {}                     #path: (size, modified time) of exports that failed, retried once they change
+    polls = 0
+    while max_polls is None or polls < max_polls: 
+        if polls: 
+            time.sleep(interval)
+        polls += 1
+        exports = find_exports(export_dir)
+        seen = {path: signature for days in exports.values() for path, signature in days.values()}
+        stable = {path for path, signature in seen.items() if last_seen.get(path) == signature}
+        last_seen = seen
+        if not exports: 
+            continue
+        week = max(exports, key = lambda number: max(signature[1] for path, signature in exports[number].values()))
+        days = {day: export for day, export in exports[week].items() if export[0] in stable}
+        if "Monday" not in days: 
+            continue
+
+        if state is None or state["week"] != week: 
+            state = new_week_state(week, year or export_year(days["Monday"][0], week))
+        elif any(days.get(day, (None, signature))[1] != signature for day, signature in state["days"].items()): 
+            warnings.warn(f"an export of week {week} was replaced, recalculating the week")
+            state = new_week_state(week, state["year"], state["written"])
+
+        applied = []
+        number = len(state["days"])
+        while number <= 5 and weekdays[number] in days: 
+            day = weekdays[number]
+            path, signature = days[day]
+            if failed.get(path) == signature: 
+                break
+            if settings.metrics and not applied: 
+                metrics.start_run()
+            try: 
+                apply_day(state, day, path)
+            except Exception as error: 
+                failed[path] = signature
+                warnings.warn(f"{path} could not be added - {error!r}")
+                break
+            state["days"][day] = signature
+            applied.append(day)
+            number += 1
+        if not applied: 
+            continue
+
+        start = time.perf_counter()
+        written = dict(state["written"])
+        write_reports(week, number-1, state["scheduled_timeline"], state["status"], state["not_scheduled_dict"], 
+                      plot = plot, written = state["written"], rejects = state["rejects"], year = state["year"])
+        changed = [name for name, fingerprint in state["written"].items() if written.get(name) != fingerprint]
+        if on_update is not None: 
+            on_update({"week": week, "days": applied, "written": changed, "seconds": time.perf_counter() - start})
+        if settings.metrics: 
+            metrics.finish_run(metrics_report, prometheus_file)
+    return state
@@ -0,0 +1,85 @@
+"""
+Week boundaries, weekday names and export file names
+"""
+
+import os
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+
+
+def beginning_end_of_week(week = None, year = None): 
+    """
+    Parameters
+    ----------
+    week : int
+        ISO week number, None uses the current week.
+    year : int
+        ISO year of the week, None uses the current year.
+
+    Returns
+    -------
+    beginning_of_week : date
+        beginning of the week (sunday)
+    end_of_week : date
+        end of the week (saturday).
+    """
+    now = datetime.now()
+    now = now.date()
+    if week is None: 
+        beginning_of_week = datetime.now().date()-timedelta(days = now.weekday()+1)
+    else: 
+        if year is None: 
+            year = now.isocalendar()[0]
+        beginning_of_week = date.fromisocalendar(year, week, 1)-timedelta(days = 1)   #sunday before the week's monday
+    beginning_of_week = pd.to_datetime(beginning_of_week)
+    end_of_week = beginning_of_week+timedelta(days = 7)
+    end_of_week = pd.to_datetime(end_of_week)
+    return beginning_of_week, end_of_week
+
+
+weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday" ]
+def weekday_name_to_num(day_name):
+    #Convert weekday name (string) to a number
+    for i in range(len(weekdays)): 
+        if weekdays[i] == day_name: 
+            return i
+
+
+def current_week(week = None, weekday = None, year = None): 
+    """
+    ISO year, week number and weekday number, today's where they aren't given 
+    (sunday counts as saturday, the last export of the week)
+
+    Parameters
+    ----------
+    week : int
+        week number, None uses the current week (and the current year if year is None too).
+    weekday : string or int
+        weekday name or number, None uses today.
+    year : int
+        ISO year, None leaves it to beginning_end_of_week unless the current week is used.
+    """
+    now_year, now_week, now_day = datetime.now().isocalendar()
+    if week is None: 
+        week = now_week
+        if year is None: 
+            year = now_year
+    if weekday is None: 
+        weekday = min(now_day-1, 5)
+    elif isinstance(weekday, str): 
+        weekday = weekday_name_to_num(weekday.capitalize())
+    return year, week, weekday
+
+
+def export_path(weekday_name, week, export_dir = "."): 
+    """
+    Path of a weekday's export, e.g. 'Monday Sched Conform Wk23.csv' (the case of Wk doesn't matter)
+    """
+    name = weekday_name +" Sched Conform Wk"+str(week)+".csv"
+    path = os.path.join(export_dir, name)
+    if not os.path.exists(path) and os.path.isdir(export_dir): 
+        for file in os.listdir(export_dir): 
+            if file.lower() == name.lower(): 
+                return os.path.join(export_dir, file)
+    return path
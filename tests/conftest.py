@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schedule_conformance import settings
+
+
+@pytest.fixture(autouse = True)
+def default_settings(): 
+    #every test starts from the defaults, without the export cache or the forecast
+    saved = settings.current()
+    settings.configure(**dict(settings.defaults, cache_dir = None, forecast_trials = 0, burn_rates_path = None))
+    yield
+    settings.configure(**saved)
+
+
+@pytest.fixture
+def repo_dir(): 
+    #the week 23 exports are in the root of the repository
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -0,0 +1,36 @@
+import os
+
+import pandas as pd
+import pytest
+
+from schedule_conformance.backfill import backfill, dates_year, export_year
+
+
+def test_export_year_from_the_dates_in_the_week(repo_dir): 
+    #saturday's latest last activity is in week 24, the year comes from monday's dates in week 23
+    assert export_year(os.path.join(repo_dir, "Monday Sched Conform WK23.csv"), 23) == 2025
+
+
+def test_export_year_warns_without_dates_in_the_week(repo_dir, tmp_path): 
+    path = tmp_path / "Monday Sched Conform WK40.csv"
+    path.write_bytes(open(os.path.join(repo_dir, "Monday Sched Conform WK23.csv"), "rb").read())
+    with pytest.warns(UserWarning, match = "using the year it was saved"): 
+        export_year(str(path), 40)
+
+
+def test_dates_year(): 
+    dates = pd.Series(pd.to_datetime(["2024-06-04", "2025-06-03", "2025-06-05", "2025-06-10", None]))
+    assert dates_year(dates, 23) == 2025
+    assert dates_year(dates, 30) is None
+
+
+def test_backfill_year(repo_dir, tmp_path): 
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    for day in ["Monday", "Tuesday"]: 
+        (exports / f"{day} Sched Conform WK23.csv").write_bytes(open(os.path.join(repo_dir, f"{day} Sched Conform WK23.csv"), "rb").read())
+    history = backfill(str(exports), str(tmp_path / "history.csv"), max_workers = 1)
+    assert history[["Year", "Week"]].drop_duplicates().values.tolist() == [[2025, 23]]
+    assert history.loc[history["Dept"] == "DeptD", "Hours"].tolist() == pytest.approx([327.1, 327.1])
+    history = backfill(str(exports), str(tmp_path / "history.csv"), max_workers = 1, year = 2026)
+    assert history[["Year", "Week"]].drop_duplicates().values.tolist() == [[2025, 23], [2026, 23]]
@@ -0,0 +1,15 @@
+import pandas as pd
+
+from schedule_conformance import beginning_end_of_week, compute_week
+from schedule_conformance.forecast import burn_rates, forecast_week
+
+
+def test_monday_forecast_draws_from_the_history(repo_dir): 
+    beginning_of_week, end_of_week = beginning_end_of_week(23, 2025)
+    timeline = compute_week(23, 2, beginning_of_week, end_of_week, pd.Timestamp("2025-06-04 12:00"), repo_dir)[2]
+    history = burn_rates(timeline, 2, 2025, 23)
+    assert set(history["Weekday"]) == {"Monday", "Tuesday"}                   #wednesday has no next day to burn to yet
+    monday = compute_week(23, 0, beginning_of_week, end_of_week, pd.Timestamp("2025-06-02 12:00"), repo_dir)[2]
+    assert forecast_week(monday, 0, trials = 100).empty                        #no progress and no history yet
+    forecast = forecast_week(monday, 0, history, trials = 100)
+    assert forecast["Weekday"].drop_duplicates().tolist() == ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
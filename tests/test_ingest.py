@@ -0,0 +1,102 @@
+import os
+import shutil
+import time
+
+import pandas as pd
+import pytest
+
+from schedule_conformance import ingest, settings
+from schedule_conformance.ingest import load_clean_export, parse_date, read_export
+
+
+@pytest.fixture
+def cached(tmp_path, monkeypatch): 
+    #exports read from the CSV instead of the cache
+    settings.configure(cache_dir = str(tmp_path / "cache"))
+    reads = []
+    monkeypatch.setattr(ingest, "read_export", lambda path, rejects = None: reads.append(path) or read_export(path, rejects))
+    return reads
+
+
+def copy_export(repo_dir, folder, day = "Monday"): 
+    folder.mkdir(exist_ok = True)
+    return shutil.copy(os.path.join(repo_dir, f"{day} Sched Conform WK23.csv"), folder)
+
+
+def test_cache_hit(repo_dir, tmp_path, cached): 
+    path = copy_export(repo_dir, tmp_path / "exports")
+    first = load_clean_export(path)
+    second = load_clean_export(path)
+    assert cached == [path]
+    pd.testing.assert_frame_equal(first, second)
+
+
+def test_replaced_export_is_read_again(repo_dir, tmp_path, cached): 
+    path = copy_export(repo_dir, tmp_path / "exports")
+    load_clean_export(path)
+    shutil.copy(os.path.join(repo_dir, "Tuesday Sched Conform WK23.csv"), path)
+    pd.testing.assert_frame_equal(load_clean_export(path), read_export(path))
+    assert cached == [path, path]
+    assert len(os.listdir(tmp_path / "cache")) == 1                           #the stale entry was removed
+
+
+def test_same_name_in_another_folder(repo_dir, tmp_path, cached): 
+    first = copy_export(repo_dir, tmp_path / "2024")
+    second = copy_export(repo_dir, tmp_path / "2025")
+    for path in [first, second, first, second]: 
+        load_clean_export(path)
+    assert cached == [first, second]                                          #neither evicts the other
+    assert len(os.listdir(tmp_path / "cache")) == 2
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_chunked_read_matches_one_pass(repo_dir, low_memory): 
+    settings.configure(low_memory = low_memory)
+    path = os.path.join(repo_dir, "Saturday Sched Conform WK23.csv")
+    one_pass = read_export(path)
+    settings.configure(ingest_chunksize = 100)
+    pd.testing.assert_frame_equal(read_export(path), one_pass)
+
+
+def test_parse_date_mixed_formats(): 
+    dates = pd.Series(["6/4/2025", "6/5/25", None, "12/31/68", "1/1/69", "not a date", "6/4/2025"])
+    expected = pd.to_datetime(["2025-06-04", "2025-06-05", None, "2068-12-31", "1969-01-01", None, "2025-06-04"])
+    pd.testing.assert_series_equal(parse_date(dates), pd.Series(expected))
+
+
+@pytest.mark.parametrize("chunksize", [None, 2])
+def test_rejects_have_the_csv_line(repo_dir, tmp_path, chunksize): 
+    settings.configure(ingest_chunksize = chunksize)
+    lines = open(os.path.join(repo_dir, "Monday Sched Conform WK23.csv"), encoding = "utf-8-sig").read().splitlines()[:8]
+    lines[4] = lines[4].replace("6/18/2025,,6/18/2025", "6/18/2025,,18/6/2025")     #M000004's complete date, day first
+    path = tmp_path / "Monday Sched Conform WK23.csv"
+    path.write_text("\n".join(lines) + "\n")
+    rejects = {}
+    with pytest.warns(UserWarning, match = "1 date values"): 
+        df = read_export(str(path), rejects)
+    assert rejects[path.name].values.tolist() == [[5, "M000004", "Sch comp", "18/6/2025"]]
+    assert df.loc[df["Order"] == "M000004", "Sch comp"].isna().all()
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_load_exports_keeps_the_order(repo_dir, monkeypatch, max_workers): 
+    paths = [os.path.join(repo_dir, f"{day} Sched Conform WK23.csv") for day in ["Monday", "Tuesday", "Wednesday"]]
+    finished = []
+    def load(path, rejects = None): 
+        time.sleep(0.2 * (len(paths) - paths.index(path)))          #the first export takes longest
+        finished.append(path)
+        return load_clean_export(path, rejects)
+    monkeypatch.setattr(ingest, "load_clean_export", load)
+    exports = list(ingest.load_exports(paths, max_workers = max_workers))
+    assert finished == (paths if max_workers == 1 else paths[::-1])
+    for export, path in zip(exports, paths): 
+        pd.testing.assert_frame_equal(export, load_clean_export(path))
+
+
+@pytest.mark.parametrize("max_workers", [1, 3])
+def test_load_exports_raises_when_the_export_is_reached(repo_dir, tmp_path, max_workers): 
+    paths = [os.path.join(repo_dir, "Monday Sched Conform WK23.csv"), str(tmp_path / "missing.csv")]
+    exports = ingest.load_exports(paths, max_workers = max_workers)
+    pd.testing.assert_frame_equal(next(exports), load_clean_export(paths[0]))
+    with pytest.raises(FileNotFoundError): 
+        next(exports)
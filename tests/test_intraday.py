@@ -0,0 +1,22 @@
+import os
+import shutil
+
+import pandas as pd
+
+from schedule_conformance import compute_intraday
+from schedule_conformance.intraday import status_tables
+
+
+def test_new_week_starts_a_new_state(repo_dir, tmp_path): 
+    for day in ["Monday", "Tuesday"]: 
+        shutil.copy(os.path.join(repo_dir, f"{day} Sched Conform WK23.csv"), tmp_path)
+    today = pd.Timestamp("2025-06-07 12:00")
+    state = compute_intraday(23, 2025, str(tmp_path), today)
+    assert len(state["snapshots"]) == 2
+    shutil.copy(os.path.join(repo_dir, "Monday Sched Conform WK23.csv"), tmp_path / "Monday Sched Conform WK24.csv")
+    state = compute_intraday(24, 2025, str(tmp_path), today, state = state)
+    assert (state["week"], state["year"]) == (24, 2025)
+    assert state["snapshots"] == [pd.Timestamp("2025-06-09")]
+    fresh = compute_intraday(24, 2025, str(tmp_path), today)          #nothing of week 23 is carried over
+    for dept, df in status_tables(fresh).items(): 
+        pd.testing.assert_frame_equal(status_tables(state)[dept], df)
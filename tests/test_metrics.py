@@ -0,0 +1,50 @@
+import json
+
+from schedule_conformance import metrics, settings
+
+
+def record_run(): 
+    settings.configure(metrics = True, metrics_memory = False)
+    metrics.start_run()
+    for weekday in ["Monday", "Tuesday"]: 
+        with metrics.stage("clean", rows_in = 10, file = "WK23.csv") as record: 
+            metrics.count("scheduled", 10, 4, weekday = weekday)
+            record["rows_out"] = 8
+        metrics.value("MO count", 3, dept = "DeptA")
+
+
+def test_run_report(): 
+    record_run()
+    report = json.loads(json.dumps(metrics.run_report(), default = str))
+    assert list(report) == ["started", "finished", "settings", "stages", "filters", "values"]
+    assert report["settings"]["metrics"] is True
+    assert [(stage["stage"], stage["labels"], stage["rows_in"], stage["rows_out"]) for stage in report["stages"]] == \
+        [("clean", {"file": "WK23.csv"}, 10, 8)] * 2
+    #filters and values take the labels of the stage they ran in
+    assert [(record["labels"], record["rows_in"], record["rows_out"]) for record in report["filters"]] == \
+        [({"file": "WK23.csv", "weekday": "Monday"}, 10, 4), ({"file": "WK23.csv", "weekday": "Tuesday"}, 10, 4)]
+    assert [(record["name"], record["labels"], record["value"]) for record in report["values"]] == [("MO count", {"dept": "DeptA"}, 3)] * 2
+
+
+def test_prometheus_text(): 
+    record_run()
+    lines = metrics.prometheus_text(prefix = "sc").splitlines()
+    help_line = lines.index("# HELP sc_stage_seconds wall time of the stage")
+    assert lines[help_line + 1] == "# TYPE sc_stage_seconds gauge"
+    #the two clean stages and the two MO counts have the same labels, so they are summed into one series
+    assert 'sc_stage_rows_in{file="WK23.csv",stage="clean"} 20' in lines
+    assert 'sc_stage_rows_out{file="WK23.csv",stage="clean"} 16' in lines
+    assert 'sc_filter_rows_out{file="WK23.csv",stage="scheduled",weekday="Monday"} 4' in lines
+    assert "# HELP sc_mo_count MO count" in lines
+    assert 'sc_mo_count{dept="DeptA"} 6' in lines
+    assert not any(line.startswith("sc_stage_peak_bytes") for line in lines)
+    assert any(line.startswith("sc_last_run_timestamp_seconds ") for line in lines)
+    assert len([line for line in lines if line.startswith("sc_stage_seconds{")]) == 1
+
+
+def test_metrics_off_records_nothing(): 
+    metrics.start_run()
+    with metrics.stage("clean", rows_in = 10) as record: 
+        record["rows_out"] = 8
+    metrics.value("MO count", 3)
+    assert metrics.records == []
@@ -0,0 +1,21 @@
+import os
+
+import pandas as pd
+import pytest
+
+from schedule_conformance.plots import ChartErrors, generate_pareto_plot, render_charts
+
+
+def pareto_jobs(folder): 
+    table = pd.DataFrame({"Reason": ["no operator", "1st pcs failed"], "MOs": [3, 1], "Cumulative %": [75.0, 100.0]})
+    return [(name, generate_pareto_plot, (table if name != "broken" else table.drop(columns = "MOs"), name, 
+                                          os.path.join(folder, name), ["png"])) 
+            for name in ["first", "broken", "last"]]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_render_charts_draws_every_chart_before_raising(tmp_path, max_workers): 
+    with pytest.raises(ChartErrors) as raised: 
+        render_charts(pareto_jobs(str(tmp_path)), max_workers)
+    assert list(raised.value.failures) == ["broken"]
+    assert sorted(os.listdir(tmp_path)) == ["first.png", "last.png"]
@@ -0,0 +1,48 @@
+import os
+
+import pandas as pd
+import pytest
+
+from schedule_conformance import beginning_end_of_week, compute_week
+from schedule_conformance.reasons import ingest_reasons, load_reasons
+from schedule_conformance.reports import write_reports, write_workbook
+
+
+def write_reasons(path, orders, reason): 
+    sheet = pd.DataFrame({"Order": orders, "Item": "I1", "Mach hrs rem": 1.5, "Status": "not started", "Reason": reason, "Comment": ""})
+    write_workbook(str(path), {"Sheet1": sheet})
+
+
+def test_year_from_the_workbook_name(tmp_path): 
+    returned = tmp_path / "returned"
+    returned.mkdir()
+    write_reasons(returned / "DeptB Sch Conf Reasons WK23 2025.xlsx", ["M1", "M2"], "no operator")
+    os.utime(returned / "DeptB Sch Conf Reasons WK23 2025.xlsx", (0, 1767225600))      #saved in 2026
+    write_reasons(returned / "DeptD Sch Conf Reasons WK23.xlsx", ["M3"], "no operator")
+    store = str(tmp_path / "reasons.sqlite")
+    with pytest.warns(UserWarning, match = "has no year"): 
+        assert ingest_reasons(str(returned), store, max_workers = 1) == 1
+    assert ingest_reasons(str(returned), store, max_workers = 1, year = 2024) == 1
+    reasons = load_reasons(store)
+    assert sorted(map(tuple, reasons[["Year", "Week", "Dept"]].drop_duplicates().values.tolist())) == [(2024, 23, "DeptD"), (2025, 23, "DeptB")]
+
+
+def test_a_week_replaces_its_earlier_rows(tmp_path): 
+    for folder, orders in [("first", ["M1", "M2"]), ("second", ["M1"])]: 
+        (tmp_path / folder).mkdir()
+        write_reasons(tmp_path / folder / "DeptB Sch Conf Reasons WK23 2025.xlsx", orders, "no operator")
+    store = str(tmp_path / "reasons.sqlite")
+    ingest_reasons(str(tmp_path / "first"), store, max_workers = 1)
+    ingest_reasons(str(tmp_path / "second"), store, max_workers = 1)
+    reasons = load_reasons(store)
+    assert reasons["Order"].tolist() == ["M1"]
+    assert reasons["File"].str.contains("second").all()
+
+
+def test_reasons_workbooks_take_the_year_of_the_exports(repo_dir, tmp_path, monkeypatch): 
+    #run in 2026, the week's exports are from 2025
+    monkeypatch.chdir(tmp_path)
+    beginning_of_week, end_of_week = beginning_end_of_week(23, 2025)
+    results = compute_week(23, 5, beginning_of_week, end_of_week, pd.Timestamp("2025-06-07 12:00"), repo_dir)
+    assert write_reports(23, 5, *results[2:], max_workers = 1, export_dir = repo_dir) == {}
+    assert "DeptB Sch Conf Reasons WK23 2025.xlsx" in os.listdir(tmp_path)
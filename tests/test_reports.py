@@ -0,0 +1,49 @@
+import os
+
+import pandas as pd
+import pytest
+from openpyxl import load_workbook
+
+from schedule_conformance import beginning_end_of_week, compute_week, settings
+from schedule_conformance.reports import write_reports, write_workbook
+
+
+def test_write_workbook(tmp_path): 
+    sheet = pd.DataFrame({"Order": ["M1", "M000002", "M3"], "Mach hrs rem": [1.5, 0.1 + 0.2, 1 / 3], "Reason": ["", None, ""]})
+    path = str(tmp_path / "reasons.xlsx")
+    write_workbook(path, {"Sheet1": sheet, "Sheet2": pd.DataFrame({"Reasons": ["no operator"]})}, 
+                   {"Sheet1": [("Sheet2!$A$2:$A$2", "C2:C21")]})
+    workbook = load_workbook(path)
+    assert workbook.sheetnames == ["Sheet1", "Sheet2"]
+    rows = [[cell.value for cell in row] for row in workbook["Sheet1"].iter_rows()]
+    assert rows == [["Order", "Mach hrs rem", "Reason"], ["M1", 1.5, None], ["M000002", 0.3, None], ["M3", 0.3333333333333333, None]]
+    #widths fit the header or the longest value as it's written (floats with 16 significant digits), plus 2
+    widths = {column: dimension.width for column, dimension in workbook["Sheet1"].column_dimensions.items()}
+    assert widths == {"A": 9, "B": 20, "C": 8}
+    validations = workbook["Sheet1"].data_validations.dataValidation
+    assert [(validation.type, validation.formula1, str(validation.sqref)) for validation in validations] == \
+        [("list", "Sheet2!$A$2:$A$2", "C2:C21")]
+    assert workbook["Sheet1"]["A1"].font.b
+
+
+def workbook_contents(path): 
+    workbook = load_workbook(path)
+    return {name: ([[cell.value for cell in row] for row in sheet.iter_rows()], 
+                   {column: dimension.width for column, dimension in sheet.column_dimensions.items()}, 
+                   [(validation.formula1, str(validation.sqref)) for validation in sheet.data_validations.dataValidation]) 
+            for name, sheet in zip(workbook.sheetnames, workbook.worksheets)}
+
+
+@pytest.mark.parametrize("pool", ["thread", "process"])
+def test_parallel_reports_match_serial(repo_dir, tmp_path, monkeypatch, pool): 
+    settings.configure(report_pool = pool)
+    beginning_of_week, end_of_week = beginning_end_of_week(23, 2025)
+    results = compute_week(23, 5, beginning_of_week, end_of_week, pd.Timestamp("2025-06-07 12:00"), repo_dir)
+    for folder, workers in [("serial", 1), ("parallel", 4)]: 
+        (tmp_path / folder).mkdir()
+        monkeypatch.chdir(tmp_path / folder)
+        assert write_reports(23, 5, *results[2:], max_workers = workers, year = 2025) == {}
+    files = sorted(os.listdir(tmp_path / "serial"))
+    assert len(files) == 12 and files == sorted(os.listdir(tmp_path / "parallel"))
+    for file in files: 
+        assert workbook_contents(tmp_path / "serial" / file) == workbook_contents(tmp_path / "parallel" / file), file
@@ -0,0 +1,124 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from schedule_conformance import (beginning_end_of_week, compute_week, diff_snapshots, settings, setup_not_sched_statuses, 
+                                  update_status)
+from schedule_conformance.departments import facility_dtype
+from schedule_conformance.status import add_not_sched_day, not_sched_progress, reference_not_sched_statuses
+
+
+def export(rows): 
+    """
+    Cleaned export from (Order, OP Seq, Description, Facility, Qty Rem, Mach hrs rem) tuples
+    """
+    df = pd.DataFrame(rows, columns = ["Order", "OP Seq", "Description", "Facility", "Qty Rem", "Mach hrs rem"])
+    df["Item"] = "ITEM" + df["Order"].str[-3:]
+    df["Facility"] = df["Facility"].astype(facility_dtype)
+    df["Dept"] = df["Facility"].astype(object).map({"MACH2": "DeptB", "MACH51": "DeptD"}).astype("category")
+    df["OP Seq"] = df["OP Seq"].astype("Int64")
+    df["Qty Rem MO"] = df["Qty Rem"]
+    df["Sch comp"] = pd.Timestamp("2025-06-04")
+    df["Act comp"] = pd.NaT
+    return df
+
+
+def test_diff_snapshots(): 
+    old = export([("M1", 10, "OPER1", "MACH2", 5, 1.5), ("M2", 10, "OPER2", "MACH2", 5, 2.0), 
+                  ("M3", 10, "OPER3", "MACH51", 5, 3.0)])
+    new = export([("M2", 10, "OPER2", "MACH2", 2, 0.8), ("M3", 10, "OPER3", "MACH51", 5, 3.0), 
+                  ("M4", 20, "OPER4", "MACH51", 1, 0.25)])
+    new.loc[1, "Sch comp"] = pd.Timestamp("2025-06-05")
+    changes = diff_snapshots(old, new, ["Qty Rem", "Mach hrs rem"])
+    assert changes[["Order", "Change"]].values.tolist() == [["M1", "completed"], ["M4", "added"], ["M2", "progressed"], 
+                                                             ["M3", "rescheduled"]]
+    completed = changes.iloc[0]
+    assert completed["Mach hrs rem old"] == 1.5 and np.isnan(completed["Mach hrs rem new"])
+    assert changes.iloc[2][["Qty Rem old", "Qty Rem new"]].tolist() == [5, 2]
+
+
+def test_diff_snapshots_first_snapshot(): 
+    new = export([("M1", 10, "OPER1", "MACH2", 5, 1.5), ("M1", 10, "OPER1", "MACH2", 5, 1.5)])
+    changes = diff_snapshots(None, new, ["Qty Rem", "Mach hrs rem"])
+    assert changes[["Order", "Change"]].values.tolist() == [["M1", "added"]]      #one row per operation
+
+
+def test_update_status(): 
+    LRP_by_day = {"Monday": export([("M1", 10, "OPER1", "MACH2", 5, 1.1), ("M2", 10, "OPER2", "MACH2", 5, 2.2), 
+                                    ("M3", 10, "OPER3", "MACH51", 5, 3.0)]), 
+                  "Tuesday": export([("M2", 10, "OPER2", "MACH2", 3, 0.1), ("M3", 10, "OPER3", "MACH51", 5, 3.0), 
+                                     ("M9", 10, "OPER9", "MACH2", 5, 7.0)])}     #M9 isn't on monday's list
+    status = {}
+    monday = update_status("Monday", LRP_by_day, None, status)
+    timeline = update_status("Tuesday", LRP_by_day, monday, status)
+    assert timeline is monday                                                     #tuesday is assigned into its columns
+    assert timeline[("Mach hrs rem", "Wednesday")].isna().all()
+    assert status["DeptB"]["MO Count"].tolist() == [2, 1]
+    assert status["DeptB"]["Hours"].tolist() == pytest.approx([3.3, 0.1])      #3.3000000000000003 summed, like the original
+    assert status["DeptD"][["MO Count", "Hours"]].values.tolist() == [[1, 3.0], [1, 3.0]]
+    assert status["DeptL"]["MO Count"].tolist() == [0, 0]
+    assert ("M9", 10) not in timeline.index
+    assert pd.isna(timeline.loc[("M1", 10), ("Mach hrs rem", "Tuesday")])          #completed
+
+
+def not_sched_week(): 
+    #M5 OP Seq 10's description is missing on tuesday (#N/A in the export), the original report kept both rows
+    return {"Monday": export([("M5", 10, "OPER5", "MACH2", 8, 4.0), ("M6", 10, "OPER6", "MACH51", 2, 1.0)]), 
+            "Tuesday": export([("M5", 10, np.nan, "MACH2", 6, 3.0), ("M7", 20, "OPER7", "MACH2", 4, 2.0)]), 
+            "Wednesday": export([("M5", 10, "OPER5", "MACH2", 2, 1.0), ("M7", 20, "OPER7", "MACH2", 1, 0.5)])}
+
+
+def test_not_sched_progress(): 
+    dept_dict = setup_not_sched_statuses(not_sched_week())
+    deptB = dept_dict["DeptB"]
+    assert deptB[["MO", "Description"]].values.tolist() == [["M5", "OPER5"], ["M5", 0], ["M7", "OPER7"]]
+    assert deptB[["Initial Mach Hrs", "End Mach Hrs", "Mach Hrs Comp"]].values.tolist() == [[4.0, 1.0, 3.0], [3.0, 0.0, 3.0], 
+                                                                                            [2.0, 0.5, 1.5]]
+    assert dept_dict["DeptD"][["MO", "End Qty", "Qty Comp"]].values.tolist() == [["M6", 0, 2]]    #not in wednesday's export
+
+
+def test_not_sched_progress_matches_reference(): 
+    week = not_sched_week()
+    for engine in ["vectorized", "rowwise"]: 
+        pd.testing.assert_frame_equal(setup_not_sched_statuses(week, engine)["DeptB"], reference_not_sched_statuses(week)["DeptB"], 
+                                      check_dtype = False)
+
+
+def test_not_sched_progress_of_an_earlier_day(): 
+    week = not_sched_week()
+    timeline = None
+    previous = None
+    for day, df in week.items(): 
+        timeline = add_not_sched_day(timeline, day, previous, df)
+        previous = df
+    deptB = not_sched_progress(timeline, "Tuesday")["DeptB"]
+    assert deptB[["MO", "End Qty"]].values.tolist() == [["M5", 0], ["M5", 6], ["M7", 4]]
+
+
+@pytest.mark.parametrize("low_memory", [False, True])
+def test_week_23_matches_original(repo_dir, low_memory): 
+    #results of the original script on the week 23 exports, run on saturday june 7th 2025 at noon
+    settings.configure(low_memory = low_memory, calc_engine = "compare")
+    beginning_of_week, end_of_week = beginning_end_of_week(23, 2025)
+    with warnings.catch_warnings(record = True) as warned: 
+        warnings.simplefilter("always")
+        results = compute_week(23, 5, beginning_of_week, end_of_week, pd.Timestamp("2025-06-07 12:00"), repo_dir)
+    LRP_by_day, not_sched_by_day, scheduled_timeline, status, not_scheduled_dict = results
+    assert [str(warning.message) for warning in warned if "engines differ" in str(warning.message)] == []
+    expected = {"DeptD": ([11, 11, 7, 5, 4, 1], [327.1, 327.1, 191.79, 143.21, 105.81, 19.63]), 
+                "DeptE": ([6, 6, 3, 3, 3, 1], [136.05, 136.05, 81.08, 58.34, 26.29, 4.17]), 
+                "DeptF": ([7, 7, 4, 2, 2, 1], [240.08, 240.08, 165.08, 155.83, 148.33, 146.0]), 
+                "DeptL": ([0, 0, 0, 0, 0, 0], [0.0, 0.0, 0.0, 0.0, 0.0, 0.0]), 
+                "DeptB": ([8, 8, 4, 3, 2, 0], [81.17, 81.17, 65.06, 32.29, 14.37, 0.0])}
+    assert {dept: (df["MO Count"].tolist(), pytest.approx(df["Hours"].tolist())) for dept, df in status.items()} == expected
+    assert status["DeptB"]["Hours Complete"].tolist()[:5] == pytest.approx([0.0, 16.11, 48.88, 66.8, 81.17])
+    #hours are summed like the original, to the last digit
+    assert status["DeptE"].loc[1:2, ["Hours", "Hours Complete"]].values.tolist() == [[136.05, 54.97], [81.08000000000001, 77.71000000000001]]
+    assert status["DeptF"]["% Hrs Complete"].tolist()[:5] == [0.0, 31.24, 35.09, 38.22, 39.19]
+    assert {dept: len(df) for dept, df in not_scheduled_dict.items()} == {"DeptD": 5, "DeptE": 0, "DeptF": 4, "DeptL": 0, "DeptB": 19}
+    assert {dept: round(df["Mach Hrs Comp"].sum(), 2) for dept, df in not_scheduled_dict.items()} == \
+        {"DeptD": 137.99, "DeptE": 0.0, "DeptF": 12.4, "DeptL": 0.0, "DeptB": 97.72}
+    M000511 = not_scheduled_dict["DeptB"][not_scheduled_dict["DeptB"]["MO"] == "M000511"]
+    assert M000511["Description"].tolist() == [0, "OPER0079"]
@@ -0,0 +1,40 @@
+import os
+import shutil
+import warnings
+
+import pandas as pd
+import pytest
+
+from schedule_conformance import beginning_end_of_week, compute_week, settings, weekdays, watch
+from schedule_conformance.watch import apply_day, describe_update, new_week_state
+
+
+@pytest.mark.parametrize("engine", ["vectorized", "compare"])
+def test_apply_day_matches_compute_week(repo_dir, engine): 
+    settings.configure(calc_engine = engine)
+    today = pd.Timestamp("2025-06-07 12:00")
+    state = new_week_state(23, 2025)
+    with warnings.catch_warnings(record = True) as warned: 
+        warnings.simplefilter("always")
+        for day in weekdays[:6]: 
+            apply_day(state, day, os.path.join(repo_dir, f"{day} Sched Conform WK23.csv"), today)
+    assert [str(warning.message) for warning in warned if "engines differ" in str(warning.message)] == []
+    beginning_of_week, end_of_week = beginning_end_of_week(23, 2025)
+    results = compute_week(23, 5, beginning_of_week, end_of_week, today, repo_dir)
+    for key in ["status", "not_scheduled_dict"]: 
+        expected = results[3] if key == "status" else results[4]
+        for dept, df in expected.items(): 
+            pd.testing.assert_frame_equal(state[key][dept], df)
+
+
+def test_watch_reports_each_update(repo_dir, tmp_path, monkeypatch): 
+    monkeypatch.chdir(tmp_path)
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    for day in ["Monday", "Tuesday"]: 
+        shutil.copy(os.path.join(repo_dir, f"{day} Sched Conform WK23.csv"), exports)
+    updates = []
+    state = watch(str(exports), interval = 0, year = 2025, plot = False, max_polls = 2, on_update = updates.append)
+    assert list(state["days"]) == ["Monday", "Tuesday"]
+    assert [update["days"] for update in updates] == [["Monday", "Tuesday"]]  #exports are used once they stop changing
+    assert describe_update(updates[0]).startswith("week 23 Monday, Tuesday: ")